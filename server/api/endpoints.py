@@ -1,17 +1,42 @@
+import hmac
+import os
 import uuid
-from typing import Dict
+from typing import Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 
-from database.config import get_db
+from database.archival import game_archiver
+from database.match_stats import match_stats
 from database.models import GameModel
+from database.storage import storage
 from domain.ball import Ball
 from domain.paddle import Paddle
-from networking.game_room_manager import Game
+from logger import log_stats
+from networking.bots import MAX_BOT_ROOMS, bot_manager
+from networking.broadcast_hub import broadcast_hub
+from networking.datagram_transport import datagram_transport
+from networking.game_room_manager import Game, GameRoom, game_room_manager
+from networking.rate_limiter import input_limiter_stats
+from networking.tick_phases import tick_phase_stats
+from telemetry.flight_recorder import flight_recorder
+from telemetry.load_monitor import ADMISSION_REDIRECT_URL, load_monitor
+from telemetry.tracing import tracer
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Admin endpoints are disabled unless set
+MAX_BULK_GAMES = int(os.getenv("MAX_BULK_GAMES", "100"))  # Games one POST /games/bulk may create
+# Seconds bulk-created games wait for their players, past the usual room expiry
+BULK_GAME_HOLD = float(os.getenv("BULK_GAME_HOLD", "3600"))
+
 endpoints = APIRouter()
 
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    if not ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
 class GameInfo(BaseModel):
     id: uuid.UUID
     state: Game.State
@@ -23,38 +48,37 @@ class GameInfo(BaseModel):
     class Config:
         from_attributes = True
 
-@endpoints.post("/games")
-async def create_game(_: Request, db: Session = Depends(get_db)):
-   """Create a new game and return its ID."""
-   game = GameModel() # Use GameModel instead of Game domain class
-   db.add(game)
-   try:
-       db.commit()
-       db.refresh(game)
-   except Exception as _:
-       db.rollback()
-       raise HTTPException(status_code=500, detail="Failed to create game")
-
-   return GameInfo(
-       id=game.id,
-       state=Game.State(game.state), # Convert DB enum to domain enum
-       player_count=len(game.players),
-       left_score=game.left_score,
-       right_score=game.right_score,
-       winner=game.winner
-   )
+
+class BulkGamesRequest(BaseModel):
+    count: int = Field(ge=1, le=MAX_BULK_GAMES)
+    reserve_slots: bool = False  # Hold both paddles for players holding the returned resume tokens
+
+
+class BulkGame(BaseModel):
+    id: uuid.UUID
+    tokens: Dict[str, str] | None = None  # Resume token per role, when slots were reserved
+
+
+def _overloaded() -> HTTPException:
+    headers = {"Retry-After": "5"}
+    if ADMISSION_REDIRECT_URL:
+        headers["Location"] = ADMISSION_REDIRECT_URL
+    return HTTPException(status_code=503, detail="Server overloaded", headers=headers)
 
 
 @endpoints.post("/games")
-async def create_game(_: Request, db: Session = Depends(get_db)):
+async def create_game(_: Request):
     """Create a new game and return its ID."""
+    if game_room_manager.draining:
+        raise HTTPException(status_code=503, detail="Server is draining")
+    if not load_monitor.admit_room():
+        raise _overloaded()
+
     game = GameModel()
-    db.add(game)
     try:
-        db.commit()
-        db.refresh(game)
+        storage.add_games([game])
     except Exception as _:
-        db.rollback()
+        storage.rollback()
         raise HTTPException(status_code=500, detail="Failed to create game")
 
     return GameInfo(
@@ -67,6 +91,41 @@ async def create_game(_: Request, db: Session = Depends(get_db)):
     )
 
 
+@endpoints.post("/games/bulk", dependencies=[Depends(require_admin)])
+async def create_games(request: BulkGamesRequest) -> Dict[str, List[BulkGame]]:
+    """Create many games at once, e.g. for a tournament, with one insert and one lobby update.
+
+    Only games with reserved slots get a room right away, to hold the reservations; the others
+    are rows until someone joins them, like games from POST /games.
+    """
+    if game_room_manager.draining:
+        raise HTTPException(status_code=503, detail="Server is draining")
+
+    try:
+        if request.reserve_slots:
+            rooms = game_room_manager.create_rooms(request.count, hold=BULK_GAME_HOLD)
+            # Each paddle is held for a new player id; organisers hand the tokens to the players
+            games = [
+                BulkGame(id=room.db_game.id, tokens={role: room.reserve(role, uuid.uuid4()) for role in GameRoom.ROLES})
+                for room in rooms
+            ]
+        else:
+            db_games = game_room_manager.create_games(request.count, hold=BULK_GAME_HOLD)
+            games = [BulkGame(id=db_game.id) for db_game in db_games]
+    except Exception as _:
+        storage.rollback()
+        raise HTTPException(status_code=500, detail="Failed to create games")
+    if not games:
+        raise _overloaded()
+    return {"games": games}
+
+
+@endpoints.get("/stats")
+async def get_stats(_: Request) -> Dict:
+    """Daily match counts and the players with the most wins, refreshed every few seconds."""
+    return await match_stats.read()
+
+
 @endpoints.get("/specs")
 def get_game_specs(_: Request) -> Dict:
     """Get the game specifications needed to set up the playing field."""
@@ -106,4 +165,53 @@ def health_check(_: Request) -> Dict:
     return {
         "status": "healthy",
         "service": "pong-server"
-    }
\ No newline at end of file
+    }
+
+@endpoints.get("/ready")
+def readiness_check(_: Request):
+    """Readiness endpoint for the load balancer, failing before running games degrade."""
+    overloaded = load_monitor.overloaded_signals()
+    ready = not overloaded and not game_room_manager.draining
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "draining": game_room_manager.draining,
+            "overloaded": overloaded,
+            "signals": load_monitor.signals()
+        }
+    )
+
+@endpoints.get("/metrics")
+def get_metrics(_: Request) -> Dict:
+    """Counters for rate limiting and other load shedding."""
+    return {
+        "input": input_limiter_stats.as_dict(),
+        "datagram": datagram_transport.stats.as_dict(),
+        "load": {**load_monitor.signals(), "refused_rooms": load_monitor.refused_rooms},
+        "logging": log_stats(),
+        "archive": {"archived": game_archiver.archived},
+        "bots": bot_manager.stats(),
+        "tick_phases": tick_phase_stats.as_dict(),
+        "broadcast": broadcast_hub.stats(),
+        "join_latency": tracer.latency.percentiles()
+    }
+
+
+@endpoints.get("/admin/flight-recorder", dependencies=[Depends(require_admin)])
+def get_flight_recorder(_: Request) -> PlainTextResponse:
+    """The last ticks recorded by the game loop as CSV, oldest first."""
+    return PlainTextResponse(flight_recorder.dump_csv(), media_type="text/csv")
+
+
+@endpoints.get("/admin/traces", dependencies=[Depends(require_admin)])
+def get_traces(_: Request) -> Dict:
+    """Recent sampled join traces, if the exporter keeps them, and join latency percentiles by stage."""
+    return {"latency": tracer.latency.percentiles(), "traces": tracer.exporter.traces()}
+
+
+@endpoints.post("/admin/bots", dependencies=[Depends(require_admin)])
+async def set_bot_rooms(rooms: int = Query(ge=0, le=MAX_BOT_ROOMS)) -> Dict:
+    """Keep the given number of bot-vs-bot rooms running; 0 stops them."""
+    await bot_manager.set_rooms(rooms)
+    return bot_manager.stats()
@@ -1,75 +1,186 @@
 import struct
+import uuid
+from urllib.parse import parse_qs
 from fastapi import WebSocket, WebSocketDisconnect
-from logger import logger
-from networking.binary_protocol import decode_command, CommandType
-from networking.game_room_manager import Game
+from starlette.types import Receive, Scope, Send
+from logger import logger, log_event
+from networking.binary_protocol import COMMAND_STRUCT, CommandType, decode_pong
+from networking.game_room_manager import Game, RECONNECT_CLOSE_CODE
+from networking.rate_limiter import InputLimiter, input_limiter_stats
+from networking.timer_wheel import IdleTimeout, timer_wheel
+from telemetry.load_monitor import ADMISSION_REDIRECT_URL
+from telemetry.tracing import tracer
 import asyncio
+import logging
+from typing import Optional
 
 CONNECTION_TIMEOUT = 60  # Connection timeout in seconds
 VALID_COMMANDS = {0x01, 0x02}  # Only paddle up/down commands are valid
+POLICY_VIOLATION_CLOSE_CODE = 1008
+TRY_AGAIN_LATER_CLOSE_CODE = 1013
 
-async def handle_game_connection(websocket: WebSocket, room_id: str, room_manager):
+
+class GameSocket:
+    """Minimal WebSocket over the raw ASGI callables, for the game connection fast path.
+
+    Offers the accept, send_bytes and close rooms use. Every send reuses the socket's one message dict.
+    """
+    __slots__ = ("receive", "_send", "_message", "closed")
+
+    def __init__(self, receive: Receive, send: Send):
+        self.receive = receive
+        self._send = send
+        self._message = {"type": "websocket.send", "bytes": b""}
+        self.closed = False
+
+    async def accept(self) -> None:
+        message = await self.receive()
+        if message["type"] != "websocket.connect":
+            self.closed = True
+            raise WebSocketDisconnect(code=1006)
+        await self._send({"type": "websocket.accept"})
+
+    async def send_bytes(self, data: bytes | memoryview) -> None:
+        if self.closed:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        # ASGI servers read the payload before their first await, so the dict can be reused
+        message = self._message
+        message["bytes"] = data
+        try:
+            await self._send(message)
+        except OSError:
+            self.closed = True
+            raise WebSocketDisconnect(code=1006)
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None) -> None:
+        if self.closed:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        self.closed = True
+        await self._send({"type": "websocket.close", "code": code, "reason": reason or ""})
+
+
+class GameConnectionApp:
+    """Raw ASGI endpoint for /game/{game_id} that reads ASGI events without Starlette's WebSocket wrapper."""
+
+    def __init__(self, room_manager):
+        self.room_manager = room_manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        websocket = GameSocket(receive, send)
+        try:
+            game_id = uuid.UUID(scope["path_params"]["game_id"])
+        except ValueError:
+            await websocket.close(code=POLICY_VIOLATION_CLOSE_CODE, reason="Invalid game id")
+            return
+
+        token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token", [None])[0]
+        await handle_game_connection(websocket, str(game_id), self.room_manager, token)
+
+
+async def handle_game_connection(websocket: GameSocket, room_id: str, room_manager,
+                                 token: Optional[str] = None):
     """Handle WebSocket connection for a game room."""
+    join = tracer.start_trace("join", room=room_id)  # Covers everything up to the player being in the room
     room = await room_manager.create_room(room_id)  # Add await here
+    if room is None:
+        tracer.end_trace(join)
+        if room_manager.draining:
+            await websocket.close(code=RECONNECT_CLOSE_CODE, reason="Server restarting")
+        else:
+            await websocket.close(code=TRY_AGAIN_LATER_CLOSE_CODE, reason=ADMISSION_REDIRECT_URL or "Server overloaded")
+        return
+
     player_role = None
+    # Cancels this handler once the connection has been idle too long
+    idle = IdleTimeout(timer_wheel, CONNECTION_TIMEOUT, asyncio.current_task().cancel)
 
     try:
-        async with asyncio.timeout(CONNECTION_TIMEOUT):
-            player_role = await room.connect(websocket)
+        player_role = await room.connect(websocket, token, on_input=idle.touch)  # UDP input keeps it alive too
+        tracer.end_trace(join)
 
         if not player_role:
             await websocket.close(code=1000, reason="Room is full")
             return
 
-        # Check game state using room.game_state instead of room.state
+        limiter = InputLimiter()
+        game = room.game_state
+        # The player's paddle is bound once, so commands don't branch on the role
+        paddle = room.paddle(player_role)
+        receive = websocket.receive
+
         while True:
-            try:
-                async with asyncio.timeout(CONNECTION_TIMEOUT):
-                    message = await websocket.receive()
+            message = await receive()
+            idle.touch()
+
+            if message["type"] != "websocket.receive":
+                websocket.closed = True  # websocket.disconnect
+                break
 
-                if message["type"] == "websocket.disconnect":
+            # Drop flooding input before doing any work on it
+            if not limiter.allow():
+                if limiter.is_offender:
+                    input_limiter_stats.disconnected += 1
+                    log_event("input_flood_disconnect", level=logging.WARNING, room=room_id, role=player_role)
+                    await websocket.close(code=POLICY_VIOLATION_CLOSE_CODE, reason="Input rate exceeded")
                     break
+                continue
 
-                if room.game_state.state != Game.State.PLAYING:
-                    continue
-
-                if message["type"] == "websocket.receive":
-                    if "bytes" in message and message["bytes"]:
-                        try:
-                            data = message["bytes"]
-                            command = decode_command(data)
-
-                            if command == CommandType.PADDLE_UP:
-                                if player_role == "left":
-                                    room.game_state.left_paddle.move_up()
-                                else:
-                                    room.game_state.right_paddle.move_up()
-                            elif command == CommandType.PADDLE_DOWN:
-                                if player_role == "left":
-                                    room.game_state.left_paddle.move_down()
-                                else:
-                                    room.game_state.right_paddle.move_down()
-
-                        except struct.error as e:
-                            logger.error(f"Error decoding command: {e}")
-                            continue
-                        except Exception as e:
-                            logger.error(f"Unexpected error processing command: {e}")
-                            continue
-            except asyncio.TimeoutError:
-                logger.warning("Connection timed out")
-                break
+            if game.state != Game.State.PLAYING:
+                continue
+
+            data = message.get("bytes")
+            if not data:
+                continue
+
+            command = data[0]
+            # Paddle commands are a single byte, as decode_command requires
+            if command == CommandType.PADDLE_UP and len(data) == COMMAND_STRUCT.size:
+                paddle.move_up()
+            elif command == CommandType.PADDLE_DOWN and len(data) == COMMAND_STRUCT.size:
+                paddle.move_down()
+            elif command == CommandType.PONG:
+                try:
+                    room.record_pong(player_role, decode_pong(data))
+                except struct.error as e:
+                    logger.error(f"Error decoding command: {e}")
+            elif command in (CommandType.PADDLE_UP, CommandType.PADDLE_DOWN):
+                logger.error(f"Error decoding command: expected {COMMAND_STRUCT.size} byte, got {len(data)}")
+            else:
+                logger.error(f"Unexpected error processing command: {command} is not a valid CommandType")
 
-    except asyncio.TimeoutError:
+    except asyncio.CancelledError:
+        if not idle.expired:
+            raise
+        asyncio.current_task().uncancel()
         logger.warning(f"Connection timeout for room {room_id}")
         await websocket.close(code=1000, reason="Connection timeout")
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected for room {room_id}")
+        log_event("websocket_disconnected", room=room_id)
     except Exception as e:
         logger.error(f"Error in websocket connection: {e}")
         await websocket.close(code=1011, reason="Internal server error")
     finally:
+        tracer.end_trace(join)
+        idle.cancel()
         if player_role:  # Only disconnect if the player was successfully connected
             room.disconnect(websocket)
-        if not room.players:
-            room_manager.remove_room(room_id)
\ No newline at end of file
+            # Rooms still played by bots or held for matched players stay until they expire
+            if not room.is_occupied and not room.reservations:
+                room_manager.remove_room(room_id)
+
+async def handle_matchmaking_connection(websocket: WebSocket, queue):
+    """Keep a player in the matchmaking queue until they are paired or leave."""
+    if queue.room_manager.draining:
+        await websocket.close(code=RECONNECT_CLOSE_CODE, reason="Server restarting")
+        return
+
+    entry = await queue.join(websocket)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        queue.leave(entry.id)
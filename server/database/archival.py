@@ -0,0 +1,62 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Callable, Set
+
+from database.storage import Storage, storage
+from logger import logger, log_event
+
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "60"))  # Seconds between archival runs
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))  # Games per transaction
+ARCHIVE_FINISHED_AFTER = float(os.getenv("ARCHIVE_FINISHED_AFTER", "300"))  # Seconds a finished game stays in games
+ARCHIVE_ABANDONED_AFTER = float(os.getenv("ARCHIVE_ABANDONED_AFTER", "86400"))  # Seconds without updates
+
+
+class GameArchiver:
+    """Move finished and abandoned games out of the hot tables into compact summaries."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.archived = 0
+        self._live_games: Callable[[], Set[uuid.UUID]] = set
+
+    def set_live_games_source(self, source: Callable[[], Set[uuid.UUID]]) -> None:
+        """Register a callable returning the games that are loaded in rooms and must not be archived."""
+        self._live_games = source
+
+    async def run(self) -> None:
+        """Archive periodically until cancelled."""
+        while True:
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+            try:
+                await self.archive()
+            except Exception as e:
+                logger.error(f"Error archiving games: {e}")
+
+    async def archive(self) -> int:
+        """Archive in small transactions until no eligible games are left."""
+        now = datetime.now(UTC)
+        finished_before = now - timedelta(seconds=ARCHIVE_FINISHED_AFTER)
+        abandoned_before = now - timedelta(seconds=ARCHIVE_ABANDONED_AFTER)
+
+        total = 0
+        while True:
+            args = (finished_before, abandoned_before, self._live_games(), ARCHIVE_BATCH_SIZE)
+            if self.storage.thread_safe:
+                archived = await asyncio.to_thread(self.storage.archive_games, *args)
+            else:
+                archived = self.storage.archive_games(*args)
+            total += archived
+            if archived < ARCHIVE_BATCH_SIZE:
+                break
+            # Let the game loop run between batches
+            await asyncio.sleep(0)
+
+        self.archived += total
+        if total:
+            log_event("games_archived", count=total)
+        return total
+
+
+game_archiver = GameArchiver(storage)
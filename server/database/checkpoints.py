@@ -0,0 +1,148 @@
+import mmap
+import os
+import uuid
+import zlib
+from struct import Struct
+from typing import Dict, List, NamedTuple, Optional
+
+from domain.game import Game
+from logger import logger
+
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoints.bin")
+CHECKPOINT_SLOTS = int(os.getenv("CHECKPOINT_SLOTS", "4096"))  # Rooms that can be checkpointed at once
+CHECKPOINT_INTERVAL_TICKS = int(os.getenv("CHECKPOINT_INTERVAL_TICKS", "6"))  # 10 times per second at 60 FPS
+
+STATES = list(Game.State)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+WINNERS = [None, "left", "right"]
+WINNER_CODES = {winner: code for code, winner in enumerate(WINNERS)}
+
+
+class Checkpoint(NamedTuple):
+    room_id: uuid.UUID
+    generation: int
+    state: Game.State
+    ball_x: float
+    ball_y: float
+    ball_dx: float
+    ball_dy: float
+    left_paddle_y: float
+    right_paddle_y: float
+    left_score: int
+    right_score: int
+    winner: Optional[str]
+
+
+class CheckpointStore:
+    """Crash-recovery checkpoints of live rooms in fixed-size slots of a memory-mapped file.
+
+    Every slot has two copies that are written alternately, each with a generation counter and
+    a CRC32, so a write torn by a crash still leaves the previous copy intact.
+    """
+    CRC = Struct('<I')
+    RECORD = Struct('<Q16sBddddddBBB')  # generation, room id, state, ball x/y/dx/dy, paddles, scores, winner
+    COPY_SIZE = 128
+
+    def __init__(self, path: str = CHECKPOINT_PATH, slots: int = CHECKPOINT_SLOTS):
+        self.path = path
+        self.slots = slots
+        self.generation = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._rooms: Dict[uuid.UUID, List[int]] = {}  # room id -> [slot, next copy]
+        self._free: List[int] = list(range(slots - 1, -1, -1))
+
+    @property
+    def is_open(self) -> bool:
+        return self._mmap is not None
+
+    def open(self) -> None:
+        size = self.slots * 2 * self.COPY_SIZE
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._view = memoryview(self._mmap)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._view.release()
+            self._mmap.close()
+            self._view = None
+            self._mmap = None
+
+    def _read_copy(self, offset: int) -> Optional[Checkpoint]:
+        record_start = offset + self.CRC.size
+        record_end = record_start + self.RECORD.size
+        (crc,) = self.CRC.unpack_from(self._mmap, offset)
+        if zlib.crc32(self._view[record_start:record_end]) != crc:
+            return None
+
+        fields = self.RECORD.unpack_from(self._mmap, record_start)
+        if fields[0] == 0:
+            return None
+        return Checkpoint(uuid.UUID(bytes=fields[1]), fields[0], STATES[fields[2]], *fields[3:9],
+                          fields[9], fields[10], WINNERS[fields[11]])
+
+    def recover(self) -> List[Checkpoint]:
+        """Read the newest intact copy of every slot and take ownership of those slots."""
+        checkpoints = []
+        if self._mmap is None:
+            return checkpoints
+
+        for slot in range(self.slots):
+            copies = [self._read_copy((slot * 2 + copy) * self.COPY_SIZE) for copy in (0, 1)]
+            valid = [checkpoint for checkpoint in copies if checkpoint is not None]
+            if not valid:
+                continue
+
+            newest = max(valid, key=lambda checkpoint: checkpoint.generation)
+            self._rooms[newest.room_id] = [slot, 1 if newest is copies[0] else 0]
+            self._free.remove(slot)
+            self.generation = max(self.generation, newest.generation)
+            checkpoints.append(newest)
+
+        logger.info(f"Recovered {len(checkpoints)} room checkpoints from {self.path}")
+        return checkpoints
+
+    def save(self, room_id: uuid.UUID, game: Game) -> None:
+        if self._mmap is None:
+            return
+
+        entry = self._rooms.get(room_id)
+        if entry is None:
+            if not self._free:
+                return
+            entry = self._rooms[room_id] = [self._free.pop(), 0]
+
+        slot, copy = entry
+        entry[1] = copy ^ 1
+        self.generation += 1
+
+        offset = (slot * 2 + copy) * self.COPY_SIZE
+        record_start = offset + self.CRC.size
+        self.RECORD.pack_into(self._mmap, record_start, self.generation, room_id.bytes, STATE_CODES[game.state],
+                              game.ball.x, game.ball.y, game.ball.dx, game.ball.dy,
+                              game.left_paddle.y_position, game.right_paddle.y_position,
+                              game.left_score, game.right_score, WINNER_CODES.get(game.winner, 0))
+        # The checksum is written last, so a torn write never validates
+        self.CRC.pack_into(self._mmap, offset,
+                           zlib.crc32(self._view[record_start:record_start + self.RECORD.size]))
+
+    def release(self, room_id: uuid.UUID) -> None:
+        """Forget a room's checkpoint once it no longer needs recovering."""
+        entry = self._rooms.pop(room_id, None)
+        if entry is None or self._mmap is None:
+            return
+
+        slot = entry[0]
+        for copy in (0, 1):
+            offset = (slot * 2 + copy) * self.COPY_SIZE
+            self._mmap[offset:offset + self.CRC.size + self.RECORD.size] = bytes(self.CRC.size + self.RECORD.size)
+        self._free.append(slot)
+
+
+checkpoint_store = CheckpointStore()
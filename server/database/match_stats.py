@@ -0,0 +1,98 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, UTC
+from typing import Dict, Optional
+
+from database.storage import Storage, storage
+from logger import logger
+
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "10"))  # Seconds between batched writes
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "5"))  # Seconds GET /stats serves a cached response
+STATS_DAYS = int(os.getenv("STATS_DAYS", "30"))  # Days of match counts reported
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "10"))
+
+
+class MatchStats:
+    """Match and player counters incremented as games finish and flushed to the stats tables in batches.
+
+    Reads come from the stats tables only, never from the game history.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self._days: Dict[date, Dict[str, float]] = defaultdict(
+            lambda: {"games": 0, "left_wins": 0, "right_wins": 0, "points": 0, "duration": 0.0})
+        self._players: Dict[uuid.UUID, Dict[str, int]] = defaultdict(lambda: {"games": 0, "wins": 0, "points": 0})
+        self._cached: Optional[Dict] = None
+        self._cached_at = 0.0
+
+    def record_game(self, winner: str, left_score: int, right_score: int, duration: float,
+                    left_player: Optional[uuid.UUID], right_player: Optional[uuid.UUID]) -> None:
+        """Count a finished game; only touches in-memory counters."""
+        day = self._days[datetime.now(UTC).date()]
+        day["games"] += 1
+        day[f"{winner}_wins"] += 1
+        day["points"] += left_score + right_score
+        day["duration"] += duration
+
+        for role, player_id, score in (("left", left_player, left_score), ("right", right_player, right_score)):
+            if player_id is None:
+                continue
+            player = self._players[player_id]
+            player["games"] += 1
+            player["wins"] += role == winner
+            player["points"] += score
+
+    @property
+    def pending(self) -> int:
+        return len(self._days) + len(self._players)
+
+    async def run(self) -> None:
+        """Flush periodically until cancelled."""
+        while True:
+            await asyncio.sleep(STATS_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the counters collected since the last flush in a single transaction."""
+        if not self.pending:
+            return
+
+        days, players = dict(self._days), dict(self._players)
+        self._days.clear()
+        self._players.clear()
+        try:
+            if self.storage.thread_safe:
+                await asyncio.to_thread(self.storage.add_stats, days, players)
+            else:
+                self.storage.add_stats(days, players)
+        except Exception as e:
+            logger.error(f"Error flushing match stats: {e}")
+            self._merge(days, players)
+
+    def _merge(self, days: Dict[date, Dict[str, float]], players: Dict[uuid.UUID, Dict[str, int]]) -> None:
+        """Put counters that failed to flush back, so the next flush retries them."""
+        for pending, deltas in ((self._days, days), (self._players, players)):
+            for key, counters in deltas.items():
+                row = pending[key]
+                for name, value in counters.items():
+                    row[name] += value
+
+    async def read(self) -> Dict:
+        """Daily match counts and the leaderboard, cached for STATS_CACHE_TTL."""
+        now = time.monotonic()
+        if self._cached is None or now - self._cached_at >= STATS_CACHE_TTL:
+            since = datetime.now(UTC).date() - timedelta(days=STATS_DAYS - 1)
+            if self.storage.thread_safe:
+                days, players = await asyncio.to_thread(self.storage.read_stats, since, LEADERBOARD_SIZE)
+            else:
+                days, players = self.storage.read_stats(since, LEADERBOARD_SIZE)
+            self._cached = {"days": days, "leaderboard": players}
+            self._cached_at = now
+        return self._cached
+
+
+match_stats = MatchStats(storage)
@@ -1,7 +1,6 @@
 from datetime import datetime, UTC
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Float, Index, Uuid, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from database.config import Base
 from domain.game import Game
@@ -10,7 +9,7 @@ from domain.game import Game
 class GameModel(Base):
     __tablename__ = "games"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     state = Column(SQLEnum(Game.State), default=Game.State.WAITING)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
@@ -21,21 +20,62 @@ class GameModel(Base):
     # Game state
     ball_x = Column(Float, default=0.5)
     ball_y = Column(Float, default=0.5)
+    ball_dx = Column(Float, nullable=True)
+    ball_dy = Column(Float, nullable=True)
     left_paddle_y = Column(Float, default=0.5)
     right_paddle_y = Column(Float, default=0.5)
 
     # Relationships
     players = relationship("PlayerModel", back_populates="game")
 
+    # Restoring, expiring and archiving all look games up by state and age
+    __table_args__ = (Index("ix_games_state_updated_at", "state", "updated_at"),)
+
 
 class PlayerModel(Base):
     __tablename__ = "players"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    game_id = Column(UUID(as_uuid=True), ForeignKey("games.id"))
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    game_id = Column(Uuid, ForeignKey("games.id"), index=True)
     role = Column(String)  # 'left' or 'right'
     connected = Column(Integer, default=True)
     joined_at = Column(DateTime, default=lambda: datetime.now(UTC))
 
     # Relationship
-    game = relationship("GameModel", back_populates="players")
\ No newline at end of file
+    game = relationship("GameModel", back_populates="players")
+
+
+class GameSummaryModel(Base):
+    """Compact record of an archived game, kept after its full rows are deleted."""
+    __tablename__ = "game_summaries"
+
+    id = Column(Uuid, primary_key=True)  # Id of the archived game
+    final_state = Column(SQLEnum(Game.State), nullable=False)  # GAME_OVER, or the state it was abandoned in
+    winner = Column(String, nullable=True)
+    left_score = Column(Integer, nullable=False)
+    right_score = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    duration = Column(Float, nullable=False)  # Seconds from creation to the last update
+
+
+class DailyStatsModel(Base):
+    """Match counters per day, incremented as games finish."""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    games = Column(Integer, nullable=False, default=0)
+    left_wins = Column(Integer, nullable=False, default=0)
+    right_wins = Column(Integer, nullable=False, default=0)
+    points = Column(Integer, nullable=False, default=0)
+    duration = Column(Float, nullable=False, default=0.0)  # Seconds played
+
+
+class PlayerStatsModel(Base):
+    """Per-player counters, incremented as games finish."""
+    __tablename__ = "player_stats"
+
+    player_id = Column(Uuid, primary_key=True)
+    games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0, index=True)  # Leaderboard order
+    points = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,392 @@
+import os
+import subprocess
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from datetime import UTC, date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, create_engine, event, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from database.config import Base, DATABASE_URL, MAX_OVERFLOW, POOL_SIZE
+from database.models import DailyStatsModel, GameModel, GameSummaryModel, PlayerModel, PlayerStatsModel
+from domain.game import Game
+from logger import logger
+from telemetry.tracing import tracer
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")  # postgres, sqlite or memory
+SQLITE_URL = os.getenv("SQLITE_URL", "sqlite:///pong.db")
+
+
+class Storage(ABC):
+    """Persistence used by rooms and endpoints.
+
+    Models handed out stay attached to the storage; changing them and calling commit persists them.
+    """
+    thread_safe = False  # Whether archive_games may run in a worker thread
+    busy_time = 0.0  # Seconds the event loop spent in add_games and commit
+
+    def prepare(self) -> None:
+        """Bring the schema up to date before the server starts."""
+
+    @abstractmethod
+    def get_game(self, game_id: uuid.UUID) -> Optional[GameModel]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_games(self, games: List[GameModel]) -> None:
+        """Insert new games and commit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_player(self, player: PlayerModel) -> None:
+        """Stage a new player; it is written by the next commit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def restorable_games(self, states: List[Game.State], updated_since: datetime,
+                         game_ids: List[uuid.UUID]) -> List[GameModel]:
+        """Games in one of the states updated since the cutoff, plus the given games, with their players."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stale_waiting_games(self, updated_before: datetime) -> List[uuid.UUID]:
+        """Ids of games still waiting for players that haven't changed since the cutoff."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_games(self, game_ids: List[uuid.UUID]) -> None:
+        """Delete games and their players, and commit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def archive_games(self, finished_before: datetime, abandoned_before: datetime,
+                      skip: Set[uuid.UUID], limit: int) -> int:
+        """Move up to limit finished or abandoned games into summaries in one transaction.
+
+        Games finished before the first cutoff and games in any state untouched since the second
+        are archived, oldest first; their players are deleted. Returns how many were archived.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_stats(self, days: Dict[date, Dict[str, float]], players: Dict[uuid.UUID, Dict[str, int]]) -> None:
+        """Add counter deltas to the daily and player stats and commit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_stats(self, since: date, leaderboard_size: int) -> Tuple[List[dict], List[dict]]:
+        """Daily stats since the given day, newest first, and the players with the most wins."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def commit(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def rollback(self) -> None:
+        raise NotImplementedError
+
+    def pool_saturation(self) -> float:
+        """Share of the database connection pool currently checked out."""
+        return 0.0
+
+
+class SqlStorage(Storage):
+    """Storage in a SQL database through a single long-lived session."""
+
+    def __init__(self, url: str):
+        self.url = url
+        if url.startswith("sqlite"):
+            # One connection shared by the event loop; also keeps in-memory databases alive
+            self.engine = create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+        else:
+            self.engine = create_engine(
+                url,
+                poolclass=QueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_timeout=30,  # 30 seconds timeout for getting a connection
+                pool_pre_ping=True  # Enable connection health checks
+            )
+            event.listen(self.engine, 'checkout', _check_connection)
+
+        # Rooms keep their models across commits; don't reload every room's row after each one
+        self._sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, expire_on_commit=False)
+        self.session = self._sessions()
+        # SQLite shares its single connection with the event loop
+        self.thread_safe = not self.is_sqlite
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.engine.dialect.name == "sqlite"
+
+    def prepare(self) -> None:
+        if self.is_sqlite:
+            Base.metadata.create_all(self.engine)
+            return
+
+        env = {**os.environ, 'PYTHONPATH': os.getcwd(), 'DATABASE_URL': self.url}
+        try:
+            subprocess.run(["alembic", "upgrade", "head"], check=True, env=env)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to run migrations: {e}")
+            raise
+
+    def get_game(self, game_id: uuid.UUID) -> Optional[GameModel]:
+        with tracer.span("db.get_game"):
+            return self.session.get(GameModel, game_id)
+
+    def add_games(self, games: List[GameModel]) -> None:
+        start = time.perf_counter()
+        try:
+            with tracer.span("db.add_games", count=len(games)):
+                self.session.add_all(games)
+                self.session.commit()
+        finally:
+            self.busy_time += time.perf_counter() - start
+
+    def add_player(self, player: PlayerModel) -> None:
+        self.session.add(player)
+
+    def restorable_games(self, states: List[Game.State], updated_since: datetime,
+                         game_ids: List[uuid.UUID]) -> List[GameModel]:
+        return self.session.query(GameModel).options(
+            selectinload(GameModel.players)
+        ).filter(or_(
+            and_(GameModel.state.in_(states), GameModel.updated_at >= updated_since),
+            GameModel.id.in_(game_ids)
+        )).all()
+
+    def stale_waiting_games(self, updated_before: datetime) -> List[uuid.UUID]:
+        rows = self.session.query(GameModel.id).filter(
+            GameModel.state == Game.State.WAITING,
+            GameModel.updated_at < updated_before
+        ).all()
+        return [row.id for row in rows]
+
+    def delete_games(self, game_ids: List[uuid.UUID]) -> None:
+        self.session.query(PlayerModel).filter(PlayerModel.game_id.in_(game_ids)).delete(synchronize_session=False)
+        self.session.query(GameModel).filter(GameModel.id.in_(game_ids)).delete(synchronize_session=False)
+        self.session.commit()
+
+    def archive_games(self, finished_before: datetime, abandoned_before: datetime,
+                      skip: Set[uuid.UUID], limit: int) -> int:
+        # A session of its own, so the archiver can run outside the event loop thread
+        with self._sessions() as session:
+            games = session.query(
+                GameModel.id, GameModel.state, GameModel.winner, GameModel.left_score,
+                GameModel.right_score, GameModel.created_at, GameModel.updated_at
+            ).filter(
+                or_(
+                    and_(GameModel.state == Game.State.GAME_OVER, GameModel.updated_at < finished_before),
+                    GameModel.updated_at < abandoned_before
+                ),
+                GameModel.id.notin_(skip)
+            ).order_by(GameModel.updated_at).limit(limit).with_for_update(skip_locked=True).all()
+            if not games:
+                return 0
+
+            game_ids = [game.id for game in games]
+            session.execute(insert(GameSummaryModel), [_summary_row(game) for game in games])
+            session.query(PlayerModel).filter(PlayerModel.game_id.in_(game_ids)).delete(synchronize_session=False)
+            session.query(GameModel).filter(GameModel.id.in_(game_ids)).delete(synchronize_session=False)
+            session.commit()
+            return len(games)
+
+    def add_stats(self, days: Dict[date, Dict[str, float]], players: Dict[uuid.UUID, Dict[str, int]]) -> None:
+        upsert = sqlite.insert if self.is_sqlite else postgresql.insert
+        with self._sessions() as session:
+            for model, key, deltas in ((DailyStatsModel, "day", days), (PlayerStatsModel, "player_id", players)):
+                if not deltas:
+                    continue
+                statement = upsert(model).values([{key: row_key, **counters} for row_key, counters in deltas.items()])
+                counters = next(iter(deltas.values()))
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=[key],
+                    set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in counters}
+                ))
+            session.commit()
+
+    def read_stats(self, since: date, leaderboard_size: int) -> Tuple[List[dict], List[dict]]:
+        with self._sessions() as session:
+            days = session.query(DailyStatsModel).filter(
+                DailyStatsModel.day >= since
+            ).order_by(DailyStatsModel.day.desc()).all()
+            players = session.query(PlayerStatsModel).order_by(
+                PlayerStatsModel.wins.desc()
+            ).limit(leaderboard_size).all()
+            return [_stats_row(day) for day in days], [_stats_row(player) for player in players]
+
+    def commit(self) -> None:
+        start = time.perf_counter()
+        try:
+            with tracer.span("db.commit"):
+                self.session.commit()
+        finally:
+            self.busy_time += time.perf_counter() - start
+
+    def rollback(self) -> None:
+        self.session.rollback()
+
+    def pool_saturation(self) -> float:
+        if self.is_sqlite:
+            return 0.0
+        return self.engine.pool.checkedout() / (POOL_SIZE + MAX_OVERFLOW)
+
+
+class MemoryStorage(Storage):
+    """Storage in process memory, for benchmarks that leave the database out."""
+
+    def __init__(self):
+        self._games: Dict[uuid.UUID, GameModel] = {}
+        self.summaries: Dict[uuid.UUID, GameSummaryModel] = {}
+        self._daily_stats: Dict[date, Dict[str, float]] = {}
+        self._player_stats: Dict[uuid.UUID, Dict[str, int]] = {}
+        # Games changed since the last commit, and whether updated_at was among the changes
+        self._changed: Dict[uuid.UUID, bool] = {}
+        _track_game_changes(self)
+
+    def _game_changed(self, game: GameModel, value, old_value, initiator) -> None:
+        if value != old_value and game.id in self._games:
+            stamped = self._changed.get(game.id, False)
+            self._changed[game.id] = stamped or initiator.key == "updated_at"
+
+    @staticmethod
+    def _apply_defaults(model) -> None:
+        # Column defaults are normally filled in on INSERT
+        for column in model.__table__.columns:
+            if column.default is not None and getattr(model, column.key) is None:
+                default = column.default
+                setattr(model, column.key, default.arg(None) if default.is_callable else default.arg)
+
+    def get_game(self, game_id: uuid.UUID) -> Optional[GameModel]:
+        return self._games.get(game_id)
+
+    def add_games(self, games: List[GameModel]) -> None:
+        for game in games:
+            self._apply_defaults(game)
+            self._games[game.id] = game
+
+    def add_player(self, player: PlayerModel) -> None:
+        self._apply_defaults(player)
+        game = self._games.get(player.game_id)
+        if game is not None:
+            game.players.append(player)
+
+    def restorable_games(self, states: List[Game.State], updated_since: datetime,
+                         game_ids: List[uuid.UUID]) -> List[GameModel]:
+        wanted = set(game_ids)
+        return [game for game in self._games.values()
+                if game.id in wanted or (game.state in states and game.updated_at >= updated_since)]
+
+    def stale_waiting_games(self, updated_before: datetime) -> List[uuid.UUID]:
+        return [game.id for game in self._games.values()
+                if game.state == Game.State.WAITING and game.updated_at < updated_before]
+
+    def delete_games(self, game_ids: List[uuid.UUID]) -> None:
+        for game_id in game_ids:
+            self._games.pop(game_id, None)
+
+    def archive_games(self, finished_before: datetime, abandoned_before: datetime,
+                      skip: Set[uuid.UUID], limit: int) -> int:
+        games = sorted(
+            (game for game in list(self._games.values()) if game.id not in skip and (
+                (game.state == Game.State.GAME_OVER and game.updated_at < finished_before)
+                or game.updated_at < abandoned_before)),
+            key=lambda game: game.updated_at
+        )[:limit]
+        for game in games:
+            self.summaries[game.id] = GameSummaryModel(**_summary_row(game))
+            del self._games[game.id]
+        return len(games)
+
+    def add_stats(self, days: Dict[date, Dict[str, float]], players: Dict[uuid.UUID, Dict[str, int]]) -> None:
+        for table, deltas in ((self._daily_stats, days), (self._player_stats, players)):
+            for row_key, counters in deltas.items():
+                row = table.setdefault(row_key, dict.fromkeys(counters, 0))
+                for name, value in counters.items():
+                    row[name] += value
+
+    def read_stats(self, since: date, leaderboard_size: int) -> Tuple[List[dict], List[dict]]:
+        days = [{"day": day, **counters} for day, counters in sorted(self._daily_stats.items(), reverse=True)
+                if day >= since]
+        players = sorted(({"player_id": player_id, **counters} for player_id, counters in self._player_stats.items()),
+                         key=lambda player: player["wins"], reverse=True)[:leaderboard_size]
+        return days, players
+
+    def commit(self) -> None:
+        # Like the column's onupdate, stamp changed games unless updated_at was set explicitly
+        changed, self._changed = self._changed, {}
+        now = datetime.now(UTC)
+        for game_id, stamped in changed.items():
+            game = self._games.get(game_id)
+            if game is not None and not stamped:
+                set_committed_value(game, "updated_at", now)  # Not a change of its own
+
+    def rollback(self) -> None:
+        self._changed.clear()
+
+
+_memory_storages: "weakref.WeakSet[MemoryStorage]" = weakref.WeakSet()
+
+
+def _track_game_changes(memory_storage: MemoryStorage) -> None:
+    """Report game column changes to the storage; the listeners are registered once, on first use."""
+    if not _memory_storages:
+        for column in GameModel.__table__.columns:
+            attribute = getattr(GameModel, column.key)
+            if not event.contains(attribute, "set", _game_changed):
+                event.listen(attribute, "set", _game_changed)
+    _memory_storages.add(memory_storage)
+
+
+def _game_changed(game: GameModel, value, old_value, initiator) -> None:
+    for memory_storage in _memory_storages:
+        memory_storage._game_changed(game, value, old_value, initiator)
+
+
+def _summary_row(game) -> dict:
+    return {
+        "id": game.id,
+        "final_state": game.state,
+        "winner": game.winner,
+        "left_score": game.left_score,
+        "right_score": game.right_score,
+        "created_at": game.created_at,
+        "finished_at": game.updated_at,
+        "duration": (game.updated_at - game.created_at).total_seconds(),
+    }
+
+
+def _stats_row(model) -> dict:
+    return {column.key: getattr(model, column.key) for column in model.__table__.columns}
+
+
+def _check_connection(dbapi_connection, connection_record, connection_proxy):
+    """Validate connection on checkout."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+    except:
+        raise Exception("Database connection failed health check")
+    finally:
+        cursor.close()
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SqlStorage(SQLITE_URL)
+    if backend == "postgres":
+        return SqlStorage(DATABASE_URL)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+storage = create_storage()
@@ -3,8 +3,9 @@ from dataclasses import field
 from enum import Enum
 
 from domain.ball import Ball
+from domain.history import StateHistory
 from domain.paddle import Paddle
-from logger import logger
+from logger import log_event
 
 @dataclass
 class Game:
@@ -19,6 +20,9 @@ class Game:
     RIGHT_PADDLE_X = 0.9  # X position for right paddle collision
     GAME_WIDTH = 1.0  # Normalized game width
     GAME_HEIGHT = 1.0  # Normalized game height
+    TICK_RATE = 60  # Updates per second
+    HISTORY_TICKS = 24  # Ticks of state kept for lag compensation (400 ms)
+    MAX_LAG_COMPENSATION = 0.2  # Seconds a paddle hit may be rewound
 
     left_paddle: Paddle = field(default_factory=Paddle)
     right_paddle: Paddle = field(default_factory=Paddle)
@@ -29,6 +33,9 @@ class Game:
     room_id: str | None = None
     state: State = field(default=State.WAITING)
     player_count: int = 0
+    left_rtt: float = 0.0  # Estimated round trip time of each player in seconds
+    right_rtt: float = 0.0
+    history: StateHistory = field(default_factory=lambda: StateHistory(Game.HISTORY_TICKS))
 
     def update(self) -> None:
         if self.winner or self.state != self.State.PLAYING or self.player_count < 2:
@@ -36,29 +43,60 @@ class Game:
 
         self.ball.update_position()
 
-        # Check for scoring
-        if self.ball.x <= 0:
+        # Check for scoring, once the player who missed has seen the ball pass them
+        if self.ball.x <= 0 and self._seen_past_wall(self.left_rtt, left=True):
             self.right_score += 1
-            logger.info(f"Room {self.room_id}: Current score - Left: {self.left_score}, Right: {self.right_score} - RIGHT SCORED!")
+            log_event("score", room=self.room_id, left=self.left_score, right=self.right_score, scorer="right")
             self.ball.reset()
+            self.history.clear()
             self._check_winner()
-        elif self.ball.x >= self.GAME_WIDTH:
+        elif self.ball.x >= self.GAME_WIDTH and self._seen_past_wall(self.right_rtt, left=False):
             self.left_score += 1
-            logger.info(f"Room {self.room_id}: Current score - Left: {self.left_score}, Right: {self.right_score} - LEFT SCORED!")
+            log_event("score", room=self.room_id, left=self.left_score, right=self.right_score, scorer="left")
             self.ball.reset()
+            self.history.clear()
             self._check_winner()
 
         # Basic paddle collision
-        if (self.ball.x <= self.LEFT_PADDLE_X and
-            self.left_paddle.y_position <= self.ball.y <= self.left_paddle.y_position + self.left_paddle.height):
+        if self.ball.x <= self.LEFT_PADDLE_X and self._paddle_hits(self.left_paddle, self.left_rtt,
+                                                                   0.0, self.LEFT_PADDLE_X):
             self.ball.x = self.LEFT_PADDLE_X
             self.ball.dx *= -1
 
-        if (self.ball.x >= self.RIGHT_PADDLE_X and
-            self.right_paddle.y_position <= self.ball.y <= self.right_paddle.y_position + self.right_paddle.height):
+        if self.ball.x >= self.RIGHT_PADDLE_X and self._paddle_hits(self.right_paddle, self.right_rtt,
+                                                                    self.RIGHT_PADDLE_X, self.GAME_WIDTH):
             self.ball.x = self.RIGHT_PADDLE_X
             self.ball.dx *= -1
 
+        self.history.record(self.ball, self.left_paddle, self.right_paddle)
+
+    def _rewind_ticks(self, rtt: float) -> int:
+        """Ticks back to the state the player was reacting to, within the compensation window."""
+        return int(min(rtt, self.MAX_LAG_COMPENSATION) * self.TICK_RATE)
+
+    def _seen_past_wall(self, rtt: float, left: bool) -> bool:
+        """Whether the ball had passed the wall one round trip ago too, so no late hit can still save it."""
+        ball_x = self.history.get(self._rewind_ticks(rtt), StateHistory.BALL_X)
+        if ball_x is None:
+            return True
+        return ball_x <= 0 if left else ball_x >= self.GAME_WIDTH
+
+    def _paddle_hits(self, paddle: Paddle, rtt: float, plane_start: float, plane_end: float) -> bool:
+        """Check a hit now, or at the ball position the player was reacting to.
+
+        Either way the ball must have been between the paddle plane and the wall behind it.
+        """
+        top, bottom = paddle.y_position, paddle.y_position + paddle.height
+        if plane_start <= self.ball.x <= plane_end and top <= self.ball.y <= bottom:
+            return True
+
+        # The paddle moves with inputs sent one round trip after the player saw the ball,
+        # so compare it with where the ball was back then, within the compensation window
+        ticks_ago = self._rewind_ticks(rtt)
+        ball_x = self.history.get(ticks_ago, StateHistory.BALL_X)
+        if ball_x is None or not plane_start <= ball_x <= plane_end:
+            return False
+        return top <= self.history.get(ticks_ago, StateHistory.BALL_Y) <= bottom
 
     def add_player(self) -> None:
         self.player_count += 1
@@ -0,0 +1,37 @@
+from array import array
+from typing import Optional
+
+from domain.ball import Ball
+from domain.paddle import Paddle
+
+
+class StateHistory:
+    """Fixed-size ring buffer of the most recent ball and paddle positions.
+
+    Storage is allocated once, so recording a tick allocates nothing.
+    """
+    FIELDS = 4  # ball x, ball y, left paddle y, right paddle y
+    BALL_X, BALL_Y, LEFT_PADDLE_Y, RIGHT_PADDLE_Y = range(FIELDS)
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = array('d', bytes(8 * capacity * self.FIELDS))
+        self._recorded = 0
+
+    def clear(self) -> None:
+        self._recorded = 0
+
+    def record(self, ball: Ball, left_paddle: Paddle, right_paddle: Paddle) -> None:
+        base = (self._recorded % self.capacity) * self.FIELDS
+        data = self._data
+        data[base] = ball.x
+        data[base + 1] = ball.y
+        data[base + 2] = left_paddle.y_position
+        data[base + 3] = right_paddle.y_position
+        self._recorded += 1
+
+    def get(self, ticks_ago: int, field: int) -> Optional[float]:
+        """Read a field as recorded the given number of ticks ago (1 is the latest record)."""
+        if ticks_ago < 1 or ticks_ago > min(self._recorded, self.capacity):
+            return None
+        return self._data[((self._recorded - ticks_ago) % self.capacity) * self.FIELDS + field]
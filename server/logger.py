@@ -1,4 +1,93 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, List
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+LOG_EVENT_RATE_LIMIT = int(os.getenv("LOG_EVENT_RATE_LIMIT", "100"))  # Records per second per event type
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")  # Per event sample rates, e.g. "score=0.1,player_connected=0.5"
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: records are dropped and counted when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread, not on the event loop
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class EventRateFilter(logging.Filter):
+    """Sample and rate limit records that carry an event type.
+
+    Rooms stepped on worker threads log too, so the counters are updated under a lock.
+    """
+
+    def __init__(self, max_per_second: int, sample_rates: Dict[str, float]):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.sample_rates = sample_rates
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self._windows: Dict[str, List] = {}  # event -> [window start, records in window]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None:
+            return True
+        with self._lock:
+            return self._admit(event)
+
+    def _admit(self, event: str) -> bool:
+        sample_rate = self.sample_rates.get(event)
+        if sample_rate is not None and random.random() >= sample_rate:
+            self.sampled_out += 1
+            return False
+
+        now = time.monotonic()
+        window = self._windows.get(event)
+        if window is None or now - window[0] >= 1.0:
+            self._windows[event] = [now, 1]
+            return True
+        if window[1] >= self.max_per_second:
+            self.rate_limited += 1
+            return False
+        window[1] += 1
+        return True
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Append the structured fields of a record as key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
 
 
 def setup_logger():
@@ -12,12 +101,37 @@ def setup_logger():
         log.setLevel(logging.INFO)
 
         console_handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(message)s')
+        formatter = KeyValueFormatter('%(message)s')
         console_handler.setFormatter(formatter)
 
-        log.addHandler(console_handler)
+        # The console is written by a background thread so a slow stdout never stalls the game loop
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        queue_handler.addFilter(EventRateFilter(LOG_EVENT_RATE_LIMIT, _parse_sampling(LOG_SAMPLING)))
+        listener = logging.handlers.QueueListener(queue_handler.queue, console_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        log.addHandler(queue_handler)
         log.propagate = False
 
     return log
 
-logger = setup_logger()
\ No newline at end of file
+
+def log_event(event: str, message: str = "", level: int = logging.INFO, **fields) -> None:
+    """Log a structured record that is subject to per-event sampling and rate limiting."""
+    if logger.isEnabledFor(level):
+        logger.log(level, message or event, extra={"event": event, "fields": fields})
+
+
+def log_stats() -> Dict[str, int]:
+    """Counters of records that were not written."""
+    handler = logger.handlers[0]
+    rate_filter = handler.filters[0]
+    return {
+        "dropped_queue_full": handler.dropped,
+        "sampled_out": rate_filter.sampled_out,
+        "rate_limited": rate_filter.rate_limited,
+        "queued": handler.queue.qsize(),
+    }
+
+logger = setup_logger()
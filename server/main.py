@@ -1,51 +1,89 @@
 import asyncio
-import os
-import subprocess
+import signal
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket
 
 from logger import logger
 from api.endpoints import endpoints
-from api.websockets import handle_game_connection
-import uuid
+from api.websockets import GameConnectionApp, handle_game_connection, handle_matchmaking_connection
+from starlette.routing import WebSocketRoute
 
+from networking.bots import BOT_ROOMS, bot_manager
+from networking.broadcast_hub import BROADCAST_WORKERS, broadcast_hub
+from networking.datagram_transport import UDP_PORT, datagram_transport
 from networking.game_room_manager import game_room_manager
 from networking.game_update_manager import game_update_manager
+from networking.matchmaking import matchmaking_queue
+from networking.room_stepper import RoomStepper
+from networking.tick_phases import TICK_PERIOD, TICK_PHASE_GAP, tick_phase_stats
+from networking.timer_wheel import timer_wheel
+from database.archival import game_archiver
+from database.match_stats import match_stats
+from database.checkpoints import CHECKPOINT_INTERVAL_TICKS, checkpoint_store
+from database.storage import storage
+from telemetry.flight_recorder import flight_recorder
+from telemetry.load_monitor import load_monitor
 
 
 class GameLoop:
     def __init__(self):
         self.shutdown_event = asyncio.Event()
+        self.stepper = RoomStepper()
+        self.ticks = 0
 
     async def run(self):
         """Run the game loop until shutdown event is set."""
         while not self.shutdown_event.is_set():
+            tick_start = time.perf_counter()
+            wall_start = time.time()
+            db_time_start = storage.busy_time
+            work = 0.0
+            rooms = frames = bytes_sent = 0
+            slowest_room_time, slowest_room = 0.0, None
             try:
-                for room in list(game_room_manager.rooms.values()):
-                    if room.players:
-                        try:
-                            room.game_state.update()
-                            if not self.shutdown_event.is_set():
-                                await room.broadcast_state()
-                        except RuntimeError:
-                            continue
+                timer_wheel.advance()
+                broadcast_hub.poll()
+                await bot_manager.step()
+                work = time.perf_counter() - tick_start
+
+                stepper = self.stepper
+                for phase, phase_rooms in enumerate(game_room_manager.phases):
+                    if phase:
+                        # Spread sends over the tick and let inbound messages in between groups
+                        await asyncio.sleep(max(0.0, tick_start + phase * TICK_PHASE_GAP - time.perf_counter()))
+                    phase_start = time.perf_counter()
+                    await stepper.step([room for room in phase_rooms.values() if room.is_occupied])
+                    broadcast_hub.publish()
+                    duration = time.perf_counter() - phase_start
+                    tick_phase_stats.record(phase, duration, stepper.rooms_stepped)
+
+                    work += duration
+                    rooms += stepper.rooms_stepped
+                    frames += stepper.frames_sent
+                    bytes_sent += stepper.bytes_sent
+                    if stepper.slowest_room_time > slowest_room_time:
+                        slowest_room_time, slowest_room = stepper.slowest_room_time, stepper.slowest_room
+
+                self.ticks += 1
+                if self.ticks % CHECKPOINT_INTERVAL_TICKS == 0:
+                    checkpoint_start = time.perf_counter()
+                    game_room_manager.checkpoint_rooms()
+                    work += time.perf_counter() - checkpoint_start
             except Exception as e:
                 logger.error(f"Error in game loop: {e}")
-            await asyncio.sleep(1 / 60)  # 60 FPS
+            load_monitor.record_tick(work)
+            flight_recorder.record(wall_start, work, rooms, frames, bytes_sent,
+                                   slowest_room_time, slowest_room, storage.busy_time - db_time_start)
+            # Phase offsets are measured from the tick start, so the next tick starts one period after this one
+            await asyncio.sleep(max(0.0, tick_start + TICK_PERIOD - time.perf_counter()))
 
     async def shutdown(self):
-        """Gracefully shutdown the game loop."""
+        """Gracefully shutdown the game loop, draining rooms for a warm restart."""
         logger.info("Application shutting down...")
         self.shutdown_event.set()
-
-        for room_id in list(game_room_manager.rooms.keys()):
-            room = game_room_manager.rooms[room_id]
-            for player in list(room.players):
-                try:
-                    await player.close(code=1000, reason="Server shutting down")
-                except Exception as e:
-                    logger.error(f"Error closing WebSocket connection in room {room_id}: {e}")
-            game_room_manager.remove_room(room_id)
+        await game_room_manager.drain()
+        self.stepper.shutdown()
 
 
 game_loop = GameLoop()
@@ -53,42 +91,70 @@ game_loop = GameLoop()
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    env = {**os.environ, 'PYTHONPATH': os.getcwd()}
-    try:
-        subprocess.run(["alembic", "upgrade", "head"], check=True, env=env)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to run migrations: {e}")
-        raise
+    storage.prepare()
+    checkpoint_store.open()
+    game_room_manager.restore_rooms()
+    if UDP_PORT:
+        await datagram_transport.start()
+    load_monitor.add_queue_source(game_update_manager.queue_depth)
+    load_monitor.set_pool_saturation_source(storage.pool_saturation)
+    game_archiver.set_live_games_source(game_room_manager.live_game_ids)
+    if BOT_ROOMS:
+        await bot_manager.set_rooms(BOT_ROOMS)
+    if BROADCAST_WORKERS:
+        broadcast_hub.set_connection_handler(
+            lambda socket, game_id, token: handle_game_connection(socket, game_id, game_room_manager, token))
+        broadcast_hub.start()
+
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, flight_recorder.dump_to_file)
 
     game_loop_task = asyncio.create_task(game_loop.run())
+    matchmaking_task = asyncio.create_task(matchmaking_queue.run())
+    load_monitor_task = asyncio.create_task(load_monitor.run())
+    archiver_task = asyncio.create_task(game_archiver.run())
+    stats_task = asyncio.create_task(match_stats.run())
     yield
     await game_loop.shutdown()
-    game_loop_task.cancel()
-    try:
-        await game_loop_task
-    except asyncio.CancelledError:
-        pass
+    for task in (game_loop_task, matchmaking_task, load_monitor_task, archiver_task, stats_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await broadcast_hub.stop()
+    await match_stats.flush()
+    datagram_transport.close()
+    checkpoint_store.close()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(endpoints)
 
 
-@app.websocket("/game/{game_id}")
-async def websocket_endpoint(websocket: WebSocket, game_id: uuid.UUID):
-    await handle_game_connection(websocket, str(game_id), game_room_manager)
+# Raw ASGI fast path; takes the room's UUID and an optional ?token= like the other endpoints
+app.router.routes.append(WebSocketRoute("/game/{game_id}", GameConnectionApp(game_room_manager)))
+
+@app.websocket("/matchmaking")
+async def matchmaking_endpoint(websocket: WebSocket):
+    """WebSocket endpoint that pairs waiting players into new rooms."""
+    await handle_matchmaking_connection(websocket, matchmaking_queue)
 
 @app.websocket("/game-updates")
-async def game_updates_endpoint(websocket: WebSocket):
+async def game_updates_endpoint(websocket: WebSocket, topics: str | None = None):
     """WebSocket endpoint for receiving game updates."""
     try:
-        await game_update_manager.connect(websocket)
+        subscriber = await game_update_manager.connect(websocket, topics)
         while True:
             try:
-                # Keep the connection alive and check for client disconnection
+                # Keep the connection alive, apply topic changes and check for client disconnection
                 message = await websocket.receive_text()
                 if message == "ping":
                     await websocket.send_text("pong")
+                elif message == "resync":
+                    game_update_manager.resync(subscriber)
+                else:
+                    subscriber.handle_command(message)
             except Exception as _:
                 break
     finally:
@@ -0,0 +1,25 @@
+"""ball velocity for exact warm restarts
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('games', sa.Column('ball_dx', sa.Float(), nullable=True))
+    op.add_column('games', sa.Column('ball_dy', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('games', 'ball_dy')
+    op.drop_column('games', 'ball_dx')
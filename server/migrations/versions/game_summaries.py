@@ -0,0 +1,40 @@
+"""game summaries and indexes for archival
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from domain.game import Game
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('game_summaries',
+                    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+                    sa.Column('final_state', postgresql.ENUM(Game.State, name='state', create_type=False), nullable=False),
+                    sa.Column('winner', sa.String(), nullable=True),
+                    sa.Column('left_score', sa.Integer(), nullable=False),
+                    sa.Column('right_score', sa.Integer(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=False),
+                    sa.Column('finished_at', sa.DateTime(), nullable=False),
+                    sa.Column('duration', sa.Float(), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+    op.create_index('ix_games_state_updated_at', 'games', ['state', 'updated_at'])
+    op.create_index('ix_players_game_id', 'players', ['game_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_players_game_id', table_name='players')
+    op.drop_index('ix_games_state_updated_at', table_name='games')
+    op.drop_table('game_summaries')
@@ -0,0 +1,43 @@
+"""incrementally maintained match statistics
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_stats',
+                    sa.Column('day', sa.Date(), nullable=False),
+                    sa.Column('games', sa.Integer(), nullable=False),
+                    sa.Column('left_wins', sa.Integer(), nullable=False),
+                    sa.Column('right_wins', sa.Integer(), nullable=False),
+                    sa.Column('points', sa.Integer(), nullable=False),
+                    sa.Column('duration', sa.Float(), nullable=False),
+                    sa.PrimaryKeyConstraint('day')
+                    )
+
+    op.create_table('player_stats',
+                    sa.Column('player_id', postgresql.UUID(as_uuid=True), nullable=False),
+                    sa.Column('games', sa.Integer(), nullable=False),
+                    sa.Column('wins', sa.Integer(), nullable=False),
+                    sa.Column('points', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('player_id')
+                    )
+    op.create_index('ix_player_stats_wins', 'player_stats', ['wins'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_stats_wins', table_name='player_stats')
+    op.drop_table('player_stats')
+    op.drop_table('daily_stats')
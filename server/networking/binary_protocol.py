@@ -1,7 +1,7 @@
 import uuid
-from struct import pack, unpack
+from struct import Struct
 from enum import IntEnum
-from typing import Optional
+from typing import Dict, List, Optional
 
 from domain.game import Game
 
@@ -9,64 +9,154 @@ from domain.game import Game
 class CommandType(IntEnum):
     PADDLE_UP = 1
     PADDLE_DOWN = 2
+    PONG = 3
 
 class MessageType(IntEnum):
     GAME_STATE = 1
     GAME_STATUS = 2
+    SESSION_TOKEN = 3
+    MATCH_FOUND = 4
+    DATAGRAM_TOKEN = 5
+    PING = 6
 
 class GameUpdateType(IntEnum):
     NEW_GAME = 1
     SCORE_UPDATE = 2
     GAME_OVER = 3
     PLAYER_JOINED = 4
+    GAME_CLOSED = 5
+    SNAPSHOT = 6
+    NEW_GAMES = 7  # Several games created at once, laid out like a snapshot
+
+
+# Formats are compiled once instead of being parsed on every call
+GAME_STATE_STRUCT = Struct('!BffffBBB')
+GAME_UPDATE_STRUCT = Struct('!B16sBBBBB')
+COMMAND_STRUCT = Struct('!B')
+SEQUENCE_STRUCT = Struct('!I')
+SNAPSHOT_HEADER_STRUCT = Struct('!BIH')
+STRING_HEADER_STRUCT = Struct('!BB')
+MATCH_FOUND_HEADER_STRUCT = Struct('!B16sBB')
+DATAGRAM_TOKEN_STRUCT = Struct('!BH16s')
+PING_STRUCT = Struct('!BI')  # Also the layout of the PONG command echoing it
+
+STATE_CODES: Dict[Game.State, int] = {
+    Game.State.WAITING: 0,
+    Game.State.PLAYING: 1,
+    Game.State.PAUSED: 2,
+    Game.State.GAME_OVER: 3
+}
+# winner_code: 0 = no winner, 1 = left won, 2 = right won
+WINNER_CODES: Dict[Optional[str], int] = {None: 0, "left": 1, "right": 2}
+# role_code: 1 = left paddle, 2 = right paddle
+ROLE_CODES: Dict[str, int] = {"left": 1, "right": 2}
+
+
+def _encode_string_message(message_type: MessageType, value: bytes) -> bytes:
+    return STRING_HEADER_STRUCT.pack(message_type, len(value)) + value
+
+
+def _encode_status(status: str) -> bytes:
+    return _encode_string_message(MessageType.GAME_STATUS, status.encode('utf-8'))
+
+
+# Every status the server sends, encoded once at import
+STATUS_WAITING_FOR_PLAYERS = _encode_status("waiting_for_players")
+STATUS_GAME_STARTING = _encode_status("game_starting")
+STATUS_GAME_PAUSED = _encode_status("game_paused")
+STATUS_GAME_OVER_LEFT = _encode_status("game_over_left")
+STATUS_GAME_OVER_RIGHT = _encode_status("game_over_right")
+
+STATUS_MESSAGES: Dict[str, bytes] = {
+    "waiting_for_players": STATUS_WAITING_FOR_PLAYERS,
+    "game_starting": STATUS_GAME_STARTING,
+    "game_paused": STATUS_GAME_PAUSED,
+    "game_over_left": STATUS_GAME_OVER_LEFT,
+    "game_over_right": STATUS_GAME_OVER_RIGHT,
+}
+
 
 def encode_game_update(update_type: GameUpdateType, game_id: uuid.UUID,
                        state: Game.State, player_count: int,
                        left_score: int = 0, right_score: int = 0,
                        winner: str | None = None) -> bytes:
     """Encode game updates into binary format."""
-    state_value = {
-        Game.State.WAITING: 0,
-        Game.State.PLAYING: 1,
-        Game.State.PAUSED: 2,
-        Game.State.GAME_OVER: 3
-    }[state]
-
-    winner_code = 0
-    if winner == "left":
-        winner_code = 1
-    elif winner == "right":
-        winner_code = 2
-
-    return pack('!B16sBBBBB',
-                       update_type.value,
-                       game_id.bytes,
-                       state_value,
-                       player_count,
-                       left_score,
-                       right_score,
-                       winner_code)
-
-
-def decode_command(data: bytes) -> CommandType:
-    """Decode binary data into a command."""
-    command_value = unpack('!B', data)[0]
+    return GAME_UPDATE_STRUCT.pack(update_type,
+                                   game_id.bytes,
+                                   STATE_CODES[state],
+                                   player_count,
+                                   left_score,
+                                   right_score,
+                                   WINNER_CODES.get(winner, 0))
+
+
+def encode_sequenced_update(record: bytes, sequence: int) -> bytes:
+    """Append a subscriber's sequence number to an encoded game update."""
+    return record + SEQUENCE_STRUCT.pack(sequence & 0xFFFFFFFF)
+
+
+def _encode_record_batch(update_type: GameUpdateType, sequence: int, records: List[bytes]) -> bytes:
+    header_size = SNAPSHOT_HEADER_STRUCT.size
+    buffer = bytearray(header_size + len(records) * GAME_UPDATE_STRUCT.size)
+    SNAPSHOT_HEADER_STRUCT.pack_into(buffer, 0, update_type, sequence & 0xFFFFFFFF, len(records))
+    buffer[header_size:] = b''.join(records)
+    return bytes(buffer)
+
+
+def encode_lobby_snapshot(sequence: int, records: List[bytes]) -> bytes:
+    """Encode every live game's latest update record into a single snapshot message."""
+    return _encode_record_batch(GameUpdateType.SNAPSHOT, sequence, records)
+
+
+def encode_new_games(sequence: int, records: List[bytes]) -> bytes:
+    """Encode the new game records of a bulk creation into one message with a single sequence number."""
+    return _encode_record_batch(GameUpdateType.NEW_GAMES, sequence, records)
+
+
+def decode_command(data: bytes | memoryview) -> CommandType:
+    """Decode binary data into a command; raises struct.error unless it is exactly one byte."""
+    command_value = COMMAND_STRUCT.unpack(data)[0]
     return CommandType(command_value)
 
 
+def decode_pong(data: bytes | memoryview) -> int:
+    """Decode the timestamp a client echoes back in a PONG command."""
+    return PING_STRUCT.unpack(data)[1]
+
+
+def encode_ping(timestamp_ms: int) -> bytes:
+    """Encode a ping carrying a server timestamp the client echoes in a PONG command."""
+    return PING_STRUCT.pack(MessageType.PING, timestamp_ms & 0xFFFFFFFF)
+
+
 def encode_game_status(status: str) -> bytes:
     """Encode game status messages.
     Status can be:
     - "waiting_for_players"
     - "game_starting"
     - "game_paused"
-    - "game_over"
+    - "game_over_left" / "game_over_right"
     """
-    status_bytes = status.encode('utf-8')
-    return pack(f'!BB{len(status_bytes)}s',
-               MessageType.GAME_STATUS,
-               len(status_bytes),
-               status_bytes)
+    return STATUS_MESSAGES.get(status) or _encode_status(status)
+
+
+def encode_session_token(token: str) -> bytes:
+    """Encode the resume token a player presents when reconnecting."""
+    return _encode_string_message(MessageType.SESSION_TOKEN, token.encode('ascii'))
+
+
+def encode_match_found(game_id: uuid.UUID, role: str, token: str) -> bytes:
+    """Encode the room, role and resume token assigned by matchmaking."""
+    token_bytes = token.encode('ascii')
+    return MATCH_FOUND_HEADER_STRUCT.pack(MessageType.MATCH_FOUND,
+                                          game_id.bytes,
+                                          ROLE_CODES[role],
+                                          len(token_bytes)) + token_bytes
+
+
+def encode_datagram_token(port: int, token: bytes) -> bytes:
+    """Encode the UDP port and token a player uses to bind the datagram transport."""
+    return DATAGRAM_TOKEN_STRUCT.pack(MessageType.DATAGRAM_TOKEN, port, token)
 
 
 def encode_game_state(ball_x: float, ball_y: float,
@@ -74,16 +164,51 @@ def encode_game_state(ball_x: float, ball_y: float,
                       left_score: int, right_score: int,
                       winner: Optional[str] = None) -> bytes:
     """Encode game state into binary format."""
-    # winner_code: 0 = no winner, 1 = left won, 2 = right won
-    winner_code = 0
-    if winner == "left":
-        winner_code = 1
-    elif winner == "right":
-        winner_code = 2
-
-    return pack('!BffffBBB',
-                MessageType.GAME_STATE,
-                ball_x, ball_y,
-                left_paddle_y, right_paddle_y,
-                left_score, right_score,
-                winner_code)
\ No newline at end of file
+    return GAME_STATE_STRUCT.pack(MessageType.GAME_STATE,
+                                  ball_x, ball_y,
+                                  left_paddle_y, right_paddle_y,
+                                  left_score, right_score,
+                                  WINNER_CODES.get(winner, 0))
+
+
+def pack_game_state_into(buffer: bytearray, offset: int, game: Game) -> None:
+    """Write a game's state frame into a preallocated buffer."""
+    GAME_STATE_STRUCT.pack_into(buffer, offset, MessageType.GAME_STATE,
+                                game.ball.x, game.ball.y,
+                                game.left_paddle.y_position, game.right_paddle.y_position,
+                                game.left_score, game.right_score,
+                                WINNER_CODES.get(game.winner, 0))
+
+
+class FrameBuffer:
+    """One preallocated buffer holding a tick's state frames for many rooms.
+
+    Frames are handed out as memoryview slices and stay valid until the next reset.
+    Senders count what they sent in sent and bytes_sent.
+    """
+    FRAME_SIZE = GAME_STATE_STRUCT.size
+
+    def __init__(self, capacity: int = 1024):
+        self._allocate(capacity)
+        self.sent = 0
+        self.bytes_sent = 0
+
+    def _allocate(self, capacity: int) -> None:
+        # A fresh buffer keeps views from earlier in the tick valid; the send counters carry over
+        self.capacity = capacity
+        self._buffer = bytearray(capacity * self.FRAME_SIZE)
+        self._view = memoryview(self._buffer)
+        self.count = 0
+
+    def reset(self) -> None:
+        self.count = 0
+        self.sent = 0
+        self.bytes_sent = 0
+
+    def pack(self, game: Game) -> memoryview:
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        offset = self.count * self.FRAME_SIZE
+        pack_game_state_into(self._buffer, offset, game)
+        self.count += 1
+        return self._view[offset:offset + self.FRAME_SIZE]
@@ -0,0 +1,101 @@
+import os
+from typing import Dict, List
+
+from domain.game import Game
+from domain.paddle import Paddle
+from logger import logger, log_event
+from networking.binary_protocol import CommandType
+from networking.game_room_manager import GameRoom, GameRoomManager, game_room_manager
+
+BOT_ROOMS = int(os.getenv("BOT_ROOMS", "0"))  # Bot-vs-bot rooms kept running from startup
+MAX_BOT_ROOMS = int(os.getenv("MAX_BOT_ROOMS", "1000"))  # Upper bound on the bot rooms that may be requested
+
+
+class BotManager:
+    """Keeps a number of bot-vs-bot rooms running to load test the server in-process.
+
+    Finished games are replaced, so the load stays constant. All bots are moved in one pass per tick.
+    """
+    DEAD_ZONE = 0.02  # Bots don't chase the ball closer than this, so paddles don't jitter
+    RETRY_TICKS = 60  # Ticks between attempts to start rooms the server refused
+
+    def __init__(self, room_manager: GameRoomManager):
+        self.room_manager = room_manager
+        self.target_rooms = 0
+        self.rooms: Dict[str, GameRoom] = {}
+        self.games_finished = 0
+        self._ticks = 0
+
+    async def set_rooms(self, count: int) -> int:
+        """Change how many bot rooms are kept running and return how many are running now."""
+        self.target_rooms = min(max(0, count), MAX_BOT_ROOMS)
+        await self._rebalance()
+        return len(self.rooms)
+
+    async def step(self) -> None:
+        """Feed every bot's next input from a simple ball tracking AI."""
+        self._ticks += 1
+        finished = False
+        live_rooms = self.room_manager.rooms
+        for game_id, room in list(self.rooms.items()):
+            if live_rooms.get(game_id) is not room:
+                # Removed by the server, e.g. expired; stop driving it and let a rebalance replace it
+                del self.rooms[game_id]
+                continue
+            game = room.game_state
+            if game.state != Game.State.PLAYING:
+                finished = finished or game.state == Game.State.GAME_OVER
+                continue
+
+            ball = game.ball
+            # Track the ball while it comes towards the paddle, otherwise return to the middle
+            self._track(room, "left", game.left_paddle, ball.y if ball.dx < 0 else 0.5)
+            self._track(room, "right", game.right_paddle, ball.y if ball.dx > 0 else 0.5)
+
+        if finished or (len(self.rooms) != self.target_rooms and self._ticks % self.RETRY_TICKS == 0):
+            await self._rebalance()
+
+    def _track(self, room: GameRoom, role: str, paddle: Paddle, target: float) -> None:
+        center = paddle.y_position + paddle.height / 2
+        if center < target - self.DEAD_ZONE:
+            room.apply_command(role, CommandType.PADDLE_UP)
+        elif center > target + self.DEAD_ZONE:
+            room.apply_command(role, CommandType.PADDLE_DOWN)
+
+    async def _rebalance(self) -> None:
+        for game_id, room in list(self.rooms.items()):
+            if self.room_manager.get_room(game_id) is not room:
+                del self.rooms[game_id]
+            elif room.game_state.state == Game.State.GAME_OVER:
+                self.games_finished += 1
+                self._remove(game_id)
+
+        while len(self.rooms) > self.target_rooms:
+            self._remove(next(iter(self.rooms)))
+
+        missing = self.target_rooms - len(self.rooms)
+        if missing <= 0:
+            return
+
+        started: List[GameRoom] = []
+        for room in self.room_manager.create_rooms(missing):
+            self.rooms[room.game_id] = room
+            if await room.add_bot("left") and await room.add_bot("right"):
+                started.append(room)
+            else:
+                self._remove(room.game_id)
+
+        if len(started) < missing:
+            logger.warning(f"Started {len(started)} of {missing} missing bot rooms")
+        if started:
+            log_event("bot_rooms_started", count=len(started), running=len(self.rooms))
+
+    def _remove(self, game_id: str) -> None:
+        self.rooms.pop(game_id, None)
+        self.room_manager.remove_room(game_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"rooms": len(self.rooms), "target_rooms": self.target_rooms, "games_finished": self.games_finished}
+
+
+bot_manager = BotManager(game_room_manager)
@@ -0,0 +1,206 @@
+import asyncio
+import multiprocessing
+import os
+import platform
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from starlette.websockets import WebSocketDisconnect
+
+from logger import logger, log_event
+from networking.binary_protocol import GAME_STATE_STRUCT
+from networking.broadcast_ring import (ACCEPT, BIND, BIND_STRUCT, CLOSE, CLOSE_STRUCT, INPUT, JOIN, JOIN_STRUCT,
+                                       LEAVE, MESSAGE_HEADER_STRUCT, SEND, SHUTDOWN, FrameRing, MessageRing)
+from networking.broadcast_worker import run_worker
+
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "0"))  # 0 sends everything from the simulation process
+BROADCAST_HOST = os.getenv("BROADCAST_HOST", "127.0.0.1")  # Behind a local proxy by default; 0.0.0.0 exposes workers
+BROADCAST_PORT = int(os.getenv("BROADCAST_PORT", "8100"))  # Worker i serves /game/{game_id} on BROADCAST_PORT + i
+BROADCAST_MAX_ROOMS = int(os.getenv("BROADCAST_MAX_ROOMS", "4096"))  # Rooms with worker connections at once
+BROADCAST_RING_BYTES = int(os.getenv("BROADCAST_RING_BYTES", str(1 << 20)))  # Per direction and worker
+FRAME_RING_DEPTH = 16  # Stepping passes a worker may fall behind before frames are overwritten
+WORKER_STOP_TIMEOUT = 5.0
+# The rings are read without locks or fences, which is only safe where stores become visible in order
+ORDERED_STORE_MACHINES = {"x86_64", "amd64", "i386", "i686", "x86"}
+
+ConnectionHandler = Callable[["RemoteSocket", str, Optional[str]], Awaitable[None]]
+
+
+class RemoteSocket:
+    """A game connection owned by a broadcast worker, with the interface of the game socket fast path.
+
+    Messages the room sends are passed to the worker; state frames go through the frame ring instead.
+    """
+    __slots__ = ("hub", "worker", "connection_id", "inbox", "closed")
+
+    def __init__(self, hub: "BroadcastHub", worker: int, connection_id: int):
+        self.hub = hub
+        self.worker = worker
+        self.connection_id = connection_id
+        self.inbox: asyncio.Queue = asyncio.Queue()  # ASGI-style events from the worker
+        self.closed = False
+
+    async def receive(self) -> Dict:
+        return await self.inbox.get()
+
+    async def accept(self) -> None:
+        self.hub.send(self.worker, MESSAGE_HEADER_STRUCT.pack(ACCEPT, self.connection_id))
+
+    async def send_bytes(self, data: bytes | memoryview) -> None:
+        if self.closed:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        if not self.hub.send(self.worker, MESSAGE_HEADER_STRUCT.pack(SEND, self.connection_id), data):
+            raise WebSocketDisconnect(code=1006)
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None) -> None:
+        if self.closed:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        self.closed = True
+        self.hub.send(self.worker, CLOSE_STRUCT.pack(CLOSE, self.connection_id, code), (reason or "").encode())
+
+
+class BroadcastHub:
+    """Moves WebSocket fan-out to worker processes, so simulation and sending scale separately.
+
+    Workers own the game connections. Each tick the simulation process writes the rooms' encoded frames
+    once into a shared-memory frame ring, which the workers read and send to every player of the room.
+    Everything else a room sends, and the players' input, goes through a lock-free message ring per
+    worker and direction. Rooms play remote connections through handle_game_connection like local ones.
+    """
+
+    def __init__(self, workers: int = BROADCAST_WORKERS):
+        self.workers = workers
+        self.frames: Optional[FrameRing] = None
+        self.to_workers: List[MessageRing] = []
+        self.from_workers: List[MessageRing] = []
+        self.processes: List[multiprocessing.Process] = []
+        self.connections: Dict[Tuple[int, int], RemoteSocket] = {}
+        self._handler: Optional[ConnectionHandler] = None
+        self._tasks = set()
+        # Frame ring slots by room, counting the connections using them; freed slots are reused last
+        self._slots: Dict[str, List[int]] = {}
+        self._connection_rooms: Dict[Tuple[int, int], str] = {}
+        self._free_slots: Deque[int] = deque(range(BROADCAST_MAX_ROOMS))
+        self.dropped_messages = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.frames is not None
+
+    def set_connection_handler(self, handler: ConnectionHandler) -> None:
+        self._handler = handler
+
+    def start(self) -> None:
+        """Create the rings and start the worker processes; does nothing on CPUs that reorder stores."""
+        if platform.machine().lower() not in ORDERED_STORE_MACHINES:
+            logger.warning(f"Broadcast workers need an x86 CPU, not {platform.machine()}; sending from the simulation")
+            return
+        self.frames = FrameRing.create(FRAME_RING_DEPTH, BROADCAST_MAX_ROOMS, GAME_STATE_STRUCT.size)
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.workers):
+            to_worker = MessageRing.create(BROADCAST_RING_BYTES)
+            from_worker = MessageRing.create(BROADCAST_RING_BYTES)
+            process = context.Process(
+                target=run_worker,
+                args=(self.frames.name, to_worker.name, from_worker.name, BROADCAST_HOST, BROADCAST_PORT + index),
+                name=f"broadcast-{index}",
+                daemon=True
+            )
+            process.start()
+            self.to_workers.append(to_worker)
+            self.from_workers.append(from_worker)
+            self.processes.append(process)
+        log_event("broadcast_workers_started", workers=self.workers, port=BROADCAST_PORT)
+
+    def send(self, worker: int, *parts: bytes | memoryview) -> bool:
+        if self.to_workers[worker].put(*parts):
+            return True
+        self.dropped_messages += 1
+        logger.warning(f"Broadcast worker {worker} is not keeping up, dropped a message")
+        return False
+
+    def poll(self) -> None:
+        """Apply what the workers received: new connections, input and disconnects."""
+        for worker, ring in enumerate(self.from_workers):
+            while (message := ring.get()) is not None:
+                kind, connection_id = MESSAGE_HEADER_STRUCT.unpack_from(message)
+                key = (worker, connection_id)
+                if kind == INPUT:
+                    socket = self.connections.get(key)
+                    if socket is not None:
+                        socket.inbox.put_nowait({"type": "websocket.receive", "bytes": message[MESSAGE_HEADER_STRUCT.size:]})
+                elif kind == JOIN:
+                    game_id = str(uuid.UUID(bytes=JOIN_STRUCT.unpack_from(message)[2]))
+                    self._join(worker, connection_id, game_id, message[JOIN_STRUCT.size:].decode() or None)
+                elif kind == LEAVE:
+                    socket = self.connections.pop(key, None)
+                    if socket is not None:
+                        socket.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+                    self._release_slot(key)
+
+    def _join(self, worker: int, connection_id: int, game_id: str, token: Optional[str]) -> None:
+        key = (worker, connection_id)
+        socket = RemoteSocket(self, worker, connection_id)
+        slot = self._slots.get(game_id)
+        if slot is None:
+            if not self._free_slots:
+                logger.warning(f"Room {game_id}: Connection rejected - no free broadcast slot")
+                self.send(worker, CLOSE_STRUCT.pack(CLOSE, connection_id, 1013), b"Server overloaded")
+                return
+            slot = self._slots[game_id] = [self._free_slots.popleft(), 0]
+        slot[1] += 1
+        self._connection_rooms[key] = game_id
+        self.connections[key] = socket
+        self.send(worker, BIND_STRUCT.pack(BIND, connection_id, slot[0]))
+
+        task = asyncio.create_task(self._handler(socket, game_id, token))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _release_slot(self, key: Tuple[int, int]) -> None:
+        game_id = self._connection_rooms.pop(key, None)
+        slot = self._slots.get(game_id)
+        if slot is None:
+            return
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._slots[game_id]
+            self._free_slots.append(slot[0])
+
+    def publish_frame(self, game_id: str, frame: bytes | memoryview) -> None:
+        """Stage a room's frame for the workers; published with the rest of the stepping pass."""
+        slot = self._slots.get(game_id)
+        if slot is not None:
+            self.frames.write(slot[0], frame)
+
+    def publish(self) -> None:
+        if self.frames is not None:
+            self.frames.publish()
+
+    async def stop(self) -> None:
+        """Let the workers deliver what is queued and exit, then free the shared memory."""
+        if self.frames is None:
+            return
+        for worker in range(self.workers):
+            self.send(worker, MESSAGE_HEADER_STRUCT.pack(SHUTDOWN, 0))
+        for process in self.processes:
+            await asyncio.to_thread(process.join, WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+        for ring in self.to_workers + self.from_workers:
+            ring.close(unlink=True)
+        self.frames.close(unlink=True)
+        self.frames = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": sum(process.is_alive() for process in self.processes),
+            "connections": len(self.connections),
+            "rooms": len(self._slots),
+            "dropped_messages": self.dropped_messages,
+        }
+
+
+broadcast_hub = BroadcastHub()
@@ -0,0 +1,218 @@
+from multiprocessing import shared_memory
+from struct import Struct
+from typing import List, Optional, Tuple
+
+COUNTER_STRUCT = Struct('<Q')
+LENGTH_STRUCT = Struct('<I')
+RECORD_STRUCT = Struct('<QI')  # stamp, length
+SLOT_STRUCT = Struct('<I')
+FRAME_RING_HEADER_STRUCT = Struct('<QIII')  # latest generation, depth, room slots, frame size
+
+# Messages between the simulation process and a broadcast worker, one per ring record. Each starts
+# with its type and the worker's connection id; INPUT and SEND carry the WebSocket message after that.
+MESSAGE_HEADER_STRUCT = Struct('<BI')
+JOIN_STRUCT = Struct('<BI16s')  # game id, followed by the resume token if any
+CLOSE_STRUCT = Struct('<BIH')  # close code, followed by the reason
+BIND_STRUCT = Struct('<BII')  # frame ring slot of the connection's room
+
+# Worker to simulation: a player opened, sent on or closed a game connection
+JOIN, INPUT, LEAVE = 1, 2, 3
+# Simulation to worker: what the room does with a connection
+ACCEPT, SEND, CLOSE, BIND, SHUTDOWN = 1, 2, 3, 4, 5
+
+
+class MessageRing:
+    """Single-producer, single-consumer queue of byte messages in shared memory.
+
+    Only the producer writes the head and only the consumer writes the tail, so neither side takes a lock.
+    Messages are length-prefixed and never split; one that doesn't fit before the end of the buffer
+    starts over at the beginning. Each record is stamped with its position once it is written, and the
+    consumer only takes records carrying the stamp it expects, so it never reads one still being written.
+    """
+    HEAD, TAIL, CAPACITY = 0, 64, 128  # Head and tail on separate cache lines
+    DATA = 192
+    WRAP = 0xFFFFFFFF
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self._buffer = shm.buf
+        self.capacity = COUNTER_STRUCT.unpack_from(self._buffer, self.CAPACITY)[0]
+        self._head = COUNTER_STRUCT.unpack_from(self._buffer, self.HEAD)[0]
+        self._tail = COUNTER_STRUCT.unpack_from(self._buffer, self.TAIL)[0]
+
+    @classmethod
+    def create(cls, capacity: int) -> "MessageRing":
+        shm = shared_memory.SharedMemory(create=True, size=cls.DATA + capacity)
+        shm.buf[:cls.DATA] = bytes(cls.DATA)
+        COUNTER_STRUCT.pack_into(shm.buf, cls.CAPACITY, capacity)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "MessageRing":
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def put(self, *parts: bytes | memoryview) -> bool:
+        """Append one message made of the given parts; False if the consumer hasn't made room for it."""
+        size = sum(len(part) for part in parts)
+        needed = RECORD_STRUCT.size + size
+        buffer = self._buffer
+        head = self._head
+        offset = head % self.capacity
+        padding = self.capacity - offset if self.capacity - offset < needed else 0
+        tail = COUNTER_STRUCT.unpack_from(buffer, self.TAIL)[0]
+        if needed + padding > self.capacity - (head - tail):
+            return False
+
+        if padding:
+            if padding >= RECORD_STRUCT.size:
+                LENGTH_STRUCT.pack_into(buffer, self.DATA + offset + COUNTER_STRUCT.size, self.WRAP)
+                COUNTER_STRUCT.pack_into(buffer, self.DATA + offset, head + 1)
+            head += padding
+            offset = 0
+
+        record = self.DATA + offset
+        LENGTH_STRUCT.pack_into(buffer, record + COUNTER_STRUCT.size, size)
+        position = record + RECORD_STRUCT.size
+        for part in parts:
+            buffer[position:position + len(part)] = part
+            position += len(part)
+        # Stamped last, with a value no earlier record at this offset had, since positions only grow
+        COUNTER_STRUCT.pack_into(buffer, record, head + 1)
+
+        self._head = head + needed
+        COUNTER_STRUCT.pack_into(buffer, self.HEAD, self._head)  # Publish once the message is written
+        return True
+
+    def get(self) -> Optional[bytes]:
+        """Take the oldest message, or None if there is none."""
+        buffer = self._buffer
+        head = COUNTER_STRUCT.unpack_from(buffer, self.HEAD)[0]
+        tail = self._tail
+        message = None
+        while tail != head:
+            offset = tail % self.capacity
+            if self.capacity - offset < RECORD_STRUCT.size:
+                tail += self.capacity - offset
+                continue
+            stamp, length = RECORD_STRUCT.unpack_from(buffer, self.DATA + offset)
+            if stamp != tail + 1:
+                break  # The head became visible before the record; it is read on the next call
+            if length == self.WRAP:
+                tail += self.capacity - offset
+                continue
+            start = self.DATA + offset + RECORD_STRUCT.size
+            message = bytes(buffer[start:start + length])
+            tail += RECORD_STRUCT.size + length
+            break
+
+        if tail != self._tail:
+            self._tail = tail
+            COUNTER_STRUCT.pack_into(buffer, self.TAIL, tail)
+        return message
+
+    def close(self, unlink: bool = False) -> None:
+        self._buffer = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A reader still holds a view; the mapping goes away with the process
+        if unlink:
+            self.shm.unlink()
+
+
+class FrameRing:
+    """The frames of the latest stepping passes, written by the simulation and read by broadcast workers.
+
+    Each pass writes its rooms' frames into the next of `depth` generations, at the rooms' slots, and
+    lists the slots it wrote. Like a seqlock, a generation is stamped with its number once published and
+    unstamped before it is overwritten; readers copy its frames and keep them only if the stamp held.
+    """
+    DATA = 64
+    STAMP, COUNT, SLOTS = 0, 8, 12  # Offsets within a generation; frames follow the slot list
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self._buffer = shm.buf
+        _, self.depth, self.slots, self.frame_size = FRAME_RING_HEADER_STRUCT.unpack_from(self._buffer, 0)
+        self._frames_offset = self.SLOTS + SLOT_STRUCT.size * self.slots
+        self._generation_size = self._frames_offset + self.slots * self.frame_size
+        self._generation = self.latest + 1
+        self._written = 0
+
+    @classmethod
+    def create(cls, depth: int, slots: int, frame_size: int) -> "FrameRing":
+        generation_size = cls.SLOTS + SLOT_STRUCT.size * slots + slots * frame_size
+        shm = shared_memory.SharedMemory(create=True, size=cls.DATA + depth * generation_size)
+        FRAME_RING_HEADER_STRUCT.pack_into(shm.buf, 0, 0, depth, slots, frame_size)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def latest(self) -> int:
+        """The newest published generation."""
+        return COUNTER_STRUCT.unpack_from(self._buffer, 0)[0]
+
+    def _base(self, generation: int) -> int:
+        return self.DATA + (generation % self.depth) * self._generation_size
+
+    def write(self, slot: int, frame: bytes | memoryview) -> None:
+        """Stage a room's frame in the generation being written."""
+        base = self._base(self._generation)
+        if not self._written:
+            COUNTER_STRUCT.pack_into(self._buffer, base + self.STAMP, 0)  # Readers of the old generation drop it
+        position = base + self._frames_offset + slot * self.frame_size
+        self._buffer[position:position + self.frame_size] = frame
+        SLOT_STRUCT.pack_into(self._buffer, base + self.SLOTS + SLOT_STRUCT.size * self._written, slot)
+        self._written += 1
+
+    def publish(self) -> None:
+        """Make the staged frames visible to readers; a pass that wrote nothing uses no generation."""
+        if not self._written:
+            return
+        base = self._base(self._generation)
+        SLOT_STRUCT.pack_into(self._buffer, base + self.COUNT, self._written)
+        COUNTER_STRUCT.pack_into(self._buffer, base + self.STAMP, self._generation)
+        COUNTER_STRUCT.pack_into(self._buffer, 0, self._generation)
+        self._generation += 1
+        self._written = 0
+
+    def frames(self, generation: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Copies of the (slot, frame) pairs of a published generation; None if it was overwritten meanwhile."""
+        buffer = self._buffer
+        base = self._base(generation)
+        if COUNTER_STRUCT.unpack_from(buffer, base + self.STAMP)[0] != generation:
+            return None
+
+        frames = base + self._frames_offset
+        count = min(SLOT_STRUCT.unpack_from(buffer, base + self.COUNT)[0], self.slots)
+        result = []
+        for i in range(count):
+            slot = SLOT_STRUCT.unpack_from(buffer, base + self.SLOTS + SLOT_STRUCT.size * i)[0]
+            if slot >= self.slots:
+                return None
+            position = frames + slot * self.frame_size
+            result.append((slot, bytes(buffer[position:position + self.frame_size])))
+
+        if COUNTER_STRUCT.unpack_from(buffer, base + self.STAMP)[0] != generation:
+            return None
+        return result
+
+    def close(self, unlink: bool = False) -> None:
+        self._buffer = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A reader still holds a view; the mapping goes away with the process
+        if unlink:
+            self.shm.unlink()
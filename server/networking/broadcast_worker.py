@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import uuid
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs
+
+from logger import logger
+from networking.broadcast_ring import (ACCEPT, BIND, BIND_STRUCT, CLOSE, CLOSE_STRUCT, INPUT, JOIN, JOIN_STRUCT,
+                                       LEAVE, MESSAGE_HEADER_STRUCT, SEND, SHUTDOWN, FrameRing, MessageRing)
+
+POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL", "0.001"))  # Seconds between polls of the rings
+POLICY_VIOLATION_CLOSE_CODE = 1008
+
+
+class WorkerConnection:
+    """A player's WebSocket, owned by the worker and played through the simulation process."""
+    __slots__ = ("id", "_send", "_message", "accepted", "closed", "slot")
+
+    def __init__(self, connection_id: int, send):
+        self.id = connection_id
+        self._send = send
+        self._message = {"type": "websocket.send", "bytes": b""}
+        self.accepted = False
+        self.closed = False
+        self.slot: Optional[int] = None
+
+    async def accept(self) -> None:
+        self.accepted = True
+        await self._send({"type": "websocket.accept"})
+
+    async def send_bytes(self, data: bytes | memoryview) -> None:
+        if not self.accepted or self.closed:
+            return
+        # ASGI servers read the payload before their first await, so the dict can be reused
+        message = self._message
+        message["bytes"] = data
+        await self._send(message)
+
+    async def close(self, code: int, reason: str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        await self._send({"type": "websocket.close", "code": code, "reason": reason})
+
+
+class BroadcastWorker:
+    """Owns game WebSockets in a worker process.
+
+    Input is forwarded to the simulation process, which answers with what to send, accept or close.
+    State frames are read from the shared frame ring and fanned out to every connection of the room.
+    Also the ASGI app serving /game/{game_id} in the worker.
+    """
+
+    def __init__(self, frames: FrameRing, inbox: MessageRing, outbox: MessageRing):
+        self.frames = frames
+        self.inbox = inbox  # Simulation to worker
+        self.outbox = outbox  # Worker to simulation
+        self.connections: Dict[int, WorkerConnection] = {}
+        self.subscribers: Dict[int, Set[WorkerConnection]] = {}  # Connections by frame ring slot
+        self.shutdown = asyncio.Event()
+        self.frames_sent = 0
+        self.skipped_generations = 0
+        self.dropped_inputs = 0
+        self._ids = itertools.count(1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (await receive())["type"] != "websocket.connect":
+            return
+        try:
+            game_id = uuid.UUID(scope["path_params"]["game_id"])
+        except ValueError:
+            await send({"type": "websocket.close", "code": POLICY_VIOLATION_CLOSE_CODE, "reason": "Invalid game id"})
+            return
+        token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token", [""])[0]
+
+        connection = WorkerConnection(next(self._ids), send)
+        self.connections[connection.id] = connection
+        try:
+            await self._put(JOIN_STRUCT.pack(JOIN, connection.id, game_id.bytes), token.encode())
+            while True:
+                message = await receive()
+                if message["type"] != "websocket.receive":
+                    break
+                data = message.get("bytes")
+                # Input is dropped rather than queued when the simulation falls behind
+                if data and not self.outbox.put(MESSAGE_HEADER_STRUCT.pack(INPUT, connection.id), data):
+                    self.dropped_inputs += 1
+        finally:
+            connection.closed = True
+            del self.connections[connection.id]
+            if connection.slot is not None:
+                self.subscribers[connection.slot].discard(connection)
+            await self._put(MESSAGE_HEADER_STRUCT.pack(LEAVE, connection.id))
+
+    async def _put(self, *parts: bytes) -> None:
+        """Send a message that must not be dropped, waiting for room in the ring."""
+        while not self.outbox.put(*parts):
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def run(self) -> None:
+        """Apply the simulation's messages and fan out new frames until shut down."""
+        parent = multiprocessing.parent_process()
+        last = self.frames.latest
+        for polls in itertools.count():
+            await self._apply_messages()
+            if self.shutdown.is_set():
+                return
+
+            latest = self.frames.latest
+            if latest - last >= self.frames.depth - 1:
+                # Frames that old are likely overwritten; only the newest is still current anyway
+                self.skipped_generations += latest - last - 1
+                last = latest - 1
+            for generation in range(last + 1, latest + 1):
+                frames = self.frames.frames(generation)
+                if frames is None:
+                    self.skipped_generations += 1  # Overwritten while it was read
+                    continue
+                for slot, frame in frames:
+                    for connection in tuple(self.subscribers.get(slot, ())):
+                        try:
+                            await connection.send_bytes(frame)
+                            self.frames_sent += 1
+                        except Exception:
+                            pass  # The connection's receive loop sees the disconnect
+            last = latest
+
+            if polls % 1000 == 0 and parent is not None and not parent.is_alive():
+                logger.warning("Simulation process exited, stopping broadcast worker")
+                self.shutdown.set()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _apply_messages(self) -> None:
+        while (message := self.inbox.get()) is not None:
+            kind, connection_id = MESSAGE_HEADER_STRUCT.unpack_from(message)
+            if kind == SHUTDOWN:
+                self.shutdown.set()
+                continue
+            connection = self.connections.get(connection_id)
+            if connection is None:
+                continue
+
+            try:
+                if kind == ACCEPT:
+                    await connection.accept()
+                elif kind == SEND:
+                    await connection.send_bytes(message[MESSAGE_HEADER_STRUCT.size:])
+                elif kind == CLOSE:
+                    code = CLOSE_STRUCT.unpack_from(message)[2]
+                    await connection.close(code, message[CLOSE_STRUCT.size:].decode())
+                elif kind == BIND:
+                    connection.slot = BIND_STRUCT.unpack_from(message)[2]
+                    self.subscribers.setdefault(connection.slot, set()).add(connection)
+            except Exception as e:
+                logger.warning(f"Broadcast worker failed to deliver to connection {connection_id}: {e}")
+
+
+def run_worker(frame_ring: str, inbox: str, outbox: str, host: str, port: int) -> None:
+    """Entry point of a broadcast worker process, serving /game/{game_id} on its own port."""
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import WebSocketRoute
+
+    worker = BroadcastWorker(FrameRing.attach(frame_ring), MessageRing.attach(inbox), MessageRing.attach(outbox))
+    app = Starlette(routes=[WebSocketRoute("/game/{game_id}", worker)])
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, lifespan="off", log_level="warning"))
+
+    async def serve() -> None:
+        pump = asyncio.create_task(worker.run())
+        server_task = asyncio.create_task(server.serve())
+        await worker.shutdown.wait()
+        server.should_exit = True
+        await server_task
+        pump.cancel()
+        for ring in (worker.frames, worker.inbox, worker.outbox):
+            ring.close()
+
+    logger.info(f"Broadcast worker listening on {host}:{port}")
+    asyncio.run(serve())
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import secrets
+from dataclasses import dataclass, field
+from enum import IntEnum
+from struct import Struct
+from typing import Callable, Dict, Optional, Tuple
+
+from logger import logger
+from networking.binary_protocol import CommandType, decode_command
+from networking.rate_limiter import InputLimiter
+
+UDP_HOST = os.getenv("UDP_HOST", "0.0.0.0")
+UDP_PORT = int(os.getenv("UDP_PORT", "0"))  # 0 disables the datagram transport
+UDP_LOSS_RATE = float(os.getenv("UDP_LOSS_RATE", "0"))  # Simulated packet loss for local testing
+
+TOKEN_SIZE = 16
+SEQUENCE_MASK = 0xFFFFFFFF
+
+
+class DatagramType(IntEnum):
+    HELLO = 0x10  # Client -> server: [type][token], binds the sender address to a session
+    HELLO_ACK = 0x11  # Server -> client: [type]
+    INPUT = 0x12  # Client -> server: [type][sequence][command]
+    STATE = 0x13  # Server -> client: [type][sequence][game state frame]
+
+
+HEADER_STRUCT = Struct('!BI')
+HELLO_ACK = bytes([DatagramType.HELLO_ACK])
+
+Address = Tuple[str, int]
+
+
+def is_newer(sequence: int, last: int) -> bool:
+    """Compare 32-bit sequence numbers, allowing them to wrap around."""
+    return 0 < ((sequence - last) & SEQUENCE_MASK) < 0x80000000
+
+
+@dataclass(eq=False)
+class DatagramSession:
+    token: bytes
+    on_command: Callable[[CommandType], None]
+    address: Optional[Address] = None
+    send_sequence: int = 0
+    last_input_sequence: int = 0
+    limiter: InputLimiter = field(default_factory=InputLimiter)
+
+
+class DatagramStats:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.stale = 0
+        self.rejected = 0
+        self.simulated_loss = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "received": self.received,
+            "stale": self.stale,
+            "rejected": self.rejected,
+            "simulated_loss": self.simulated_loss,
+        }
+
+
+class DatagramTransport(asyncio.DatagramProtocol):
+    """Unreliable side channel for state frames and paddle input.
+
+    Players authenticate with a token handed out over their game WebSocket, which
+    keeps carrying status, join and game over messages.
+    """
+
+    def __init__(self, loss_rate: float = UDP_LOSS_RATE):
+        self.loss_rate = loss_rate
+        self.sessions: Dict[bytes, DatagramSession] = {}
+        self._by_address: Dict[Address, DatagramSession] = {}
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.port = 0
+        self.stats = DatagramStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.transport is not None
+
+    async def start(self, host: str = UDP_HOST, port: int = UDP_PORT) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        self.port = self.transport.get_extra_info("sockname")[1]
+        logger.info(f"Datagram transport listening on {host}:{self.port}")
+
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def open_session(self, on_command: Callable[[CommandType], None]) -> DatagramSession:
+        session = DatagramSession(secrets.token_bytes(TOKEN_SIZE), on_command)
+        self.sessions[session.token] = session
+        return session
+
+    def close_session(self, session: DatagramSession) -> None:
+        self.sessions.pop(session.token, None)
+        if session.address is not None:
+            self._by_address.pop(session.address, None)
+
+    def _lose(self) -> bool:
+        if self.loss_rate and random.random() < self.loss_rate:
+            self.stats.simulated_loss += 1
+            return True
+        return False
+
+    def datagram_received(self, data: bytes, address: Address) -> None:
+        if self._lose() or not data:
+            return
+        self.stats.received += 1
+
+        kind = data[0]
+        if kind == DatagramType.INPUT and len(data) == HEADER_STRUCT.size + 1:
+            session = self._by_address.get(address)
+            if session is None:
+                self.stats.rejected += 1
+                return
+
+            sequence = HEADER_STRUCT.unpack_from(data)[1]
+            if not is_newer(sequence, session.last_input_sequence):
+                self.stats.stale += 1
+                return
+            session.last_input_sequence = sequence
+
+            if session.limiter.allow():
+                try:
+                    session.on_command(decode_command(memoryview(data)[HEADER_STRUCT.size:]))
+                except ValueError:
+                    self.stats.rejected += 1
+
+        elif kind == DatagramType.HELLO and len(data) == 1 + TOKEN_SIZE:
+            session = self.sessions.get(data[1:])
+            if session is None:
+                self.stats.rejected += 1
+                return
+            if session.address is not None:
+                self._by_address.pop(session.address, None)
+            session.address = address
+            self._by_address[address] = session
+            self._send(HELLO_ACK, address)
+
+        else:
+            self.stats.rejected += 1
+
+    def send_state(self, session: DatagramSession, frame: bytes | memoryview) -> bool:
+        """Send a state frame if the session is bound, returning False otherwise."""
+        if session.address is None or self.transport is None:
+            return False
+
+        session.send_sequence = (session.send_sequence + 1) & SEQUENCE_MASK
+        packet = bytearray(HEADER_STRUCT.size + len(frame))
+        HEADER_STRUCT.pack_into(packet, 0, DatagramType.STATE, session.send_sequence)
+        packet[HEADER_STRUCT.size:] = frame
+        self._send(packet, session.address)
+        return True
+
+    def _send(self, packet: bytes | bytearray, address: Address) -> None:
+        if self._lose():
+            return
+        self.transport.sendto(packet, address)
+        self.stats.sent += 1
+
+
+datagram_transport = DatagramTransport()
@@ -1,31 +1,68 @@
-from typing import Dict, Optional, Set
+from datetime import datetime, timedelta, UTC
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 import asyncio
+import logging
+import os
+import time
 from fastapi import WebSocket, HTTPException
 from starlette.websockets import WebSocketDisconnect
-from sqlalchemy.orm import Session
 import uuid
 from domain.game import Game
-from logger import logger
-from networking.binary_protocol import encode_game_state, encode_game_status
+from domain.paddle import Paddle
+from logger import logger, log_event
+from networking.binary_protocol import (CommandType, FrameBuffer, encode_datagram_token, encode_game_state,
+                                       encode_game_status, encode_ping, encode_session_token)
+from networking.broadcast_hub import RemoteSocket, broadcast_hub
+from networking.datagram_transport import DatagramSession, datagram_transport
 from database.models import GameModel, PlayerModel
-from database.config import SessionLocal, acquire_game_connection, release_game_connection
+from database.checkpoints import Checkpoint, checkpoint_store
+from database.match_stats import match_stats
+from database.config import acquire_game_connection, release_game_connection
+from database.storage import Storage, storage
 from networking.game_update_manager import game_update_manager
+from networking.resume_tokens import issue_token, verify_token
+from networking.tick_phases import TICK_PHASES, tick_phase
+from networking.timer_wheel import IdleTimeout, timer_wheel
+from telemetry.load_monitor import load_monitor
+from telemetry.tracing import tracer
+
+RECONNECT_CLOSE_CODE = 1012  # "Service Restart": clients should reconnect to the same room
+RESTORE_WINDOW = float(os.getenv("ROOM_RESTORE_WINDOW", "600"))  # Seconds a drained room stays restorable
+ROOM_EXPIRY = float(os.getenv("ROOM_EXPIRY", "300"))  # Seconds an empty room and an unjoined game are kept
+
+
+class RoomStep(NamedTuple):
+    previous_score: Tuple[int, int]
+    previous_state: Game.State
+    frame: Optional[bytes | memoryview]  # None when nobody occupies the room
 
 
 class GameRoom:
-    SAVE_INTERVAL = 0.2  # 5 times per second
+    ROLES = ("left", "right")
+    PING_INTERVAL_TICKS = 60  # Measure player round trip times once per second
+    RTT_SMOOTHING = 0.3
+    MAX_RTT = 2.0  # Seconds; slower echoes are ignored
 
-    def __init__(self, game_id: str, db: Session):
+    def __init__(self, game_id: str, storage: Storage, db_game: Optional[GameModel] = None, is_new: bool = False):
         self.game_state = Game()
         self.game_state.room_id = game_id
         self.players: Set[WebSocket] = set()
         self.player_roles: Dict[WebSocket, str] = {}
+        self.bot_roles: Set[str] = set()  # Paddles played by server-side bots
+        self.pending_roles: Set[str] = set()  # Roles claimed by joins still being accepted
+        self.player_records: Dict[str, PlayerModel] = {}  # Latest player row per role
+        self.reservations: Dict[str, uuid.UUID] = {}  # Roles held for a specific player id
+        self.held_until = 0.0  # Monotonic time until which the room is kept while waiting, past its expiry
+        self.datagram_sessions: Dict[WebSocket, DatagramSession] = {}
         self.game_id = game_id
-        self.db = db
-        self._save_task: Optional[asyncio.Task] = None
-
-        # Create or get game from database
-        self.db_game = self.db.query(GameModel).filter(GameModel.id == uuid.UUID(game_id)).first()
+        self.tick_phase = tick_phase(game_id)
+        self.storage = storage
+        self._holds_game_connection = False
+        self._ticks = 0
+        self.idle: Optional[IdleTimeout] = None  # Expires the room while nobody is connected
+
+        # Create or get game from database, unless it was preloaded during a warm restart
+        self.db_game = db_game or self.storage.get_game(uuid.UUID(game_id))
         if not self.db_game:
             self.db_game = GameModel(
                 id=uuid.UUID(game_id),
@@ -35,197 +72,431 @@ class GameRoom:
                 left_paddle_y=self.game_state.left_paddle.y_position,
                 right_paddle_y=self.game_state.right_paddle.y_position
             )
-            self.db.add(self.db_game)
-            self.db.commit()
+            self.storage.add_games([self.db_game])
 
             # Broadcast new game creation
-            asyncio.create_task(game_update_manager.broadcast_new_game(
+            game_update_manager.broadcast_new_game(
                 self.db_game.id,
                 self.game_state.state
-            ))
-        else:
-            # Restore game state from database
-            # Get just the enum value name without the 'State.' prefix
-            state_name = str(self.db_game.state.value)  # This will give us e.g. 'WAITING' instead of 'State.WAITING'
-            self.game_state.state = Game.State(state_name)
-            self.game_state.ball.x = float(str(self.db_game.ball_x))
-            self.game_state.ball.y = float(str(self.db_game.ball_y))
-            self.game_state.left_paddle.y_position = float(str(self.db_game.left_paddle_y))
-            self.game_state.right_paddle.y_position = float(str(self.db_game.right_paddle_y))
-            self.game_state.left_score = int(str(self.db_game.left_score))
-            self.game_state.right_score = int(str(self.db_game.right_score))
-            self.game_state.winner = str(self.db_game.winner) if self.db_game.winner else None
-
-    async def connect(self, websocket: WebSocket) -> Optional[str]:
-        if len(self.players) >= 2:
+            )
+        elif not is_new:
+            self._restore_from_model()
+
+    def _restore_from_model(self) -> None:
+        """Restore game state from the database model."""
+        # Get just the enum value name without the 'State.' prefix
+        state_name = str(self.db_game.state.value)  # This will give us e.g. 'WAITING' instead of 'State.WAITING'
+        self.game_state.state = Game.State(state_name)
+        self.game_state.ball.x = float(str(self.db_game.ball_x))
+        self.game_state.ball.y = float(str(self.db_game.ball_y))
+        if self.db_game.ball_dx is not None:
+            self.game_state.ball.dx = float(str(self.db_game.ball_dx))
+            self.game_state.ball.dy = float(str(self.db_game.ball_dy))
+        self.game_state.left_paddle.y_position = float(str(self.db_game.left_paddle_y))
+        self.game_state.right_paddle.y_position = float(str(self.db_game.right_paddle_y))
+        self.game_state.left_score = int(str(self.db_game.left_score))
+        self.game_state.right_score = int(str(self.db_game.right_score))
+        self.game_state.winner = str(self.db_game.winner) if self.db_game.winner else None
+
+        for player in sorted(self.db_game.players, key=lambda p: p.joined_at):
+            self.player_records[player.role] = player
+
+        # Nobody is connected to a freshly restored room, so a running game waits for its players
+        if self.game_state.state == Game.State.PLAYING:
+            self.game_state.state = Game.State.PAUSED
+
+    def apply_checkpoint(self, checkpoint: Checkpoint) -> bool:
+        """Restore the state written to the crash-recovery checkpoint, unless the database is newer.
+
+        Scores only go up within a game, so a checkpoint behind the database row's scores is stale.
+        """
+        if (checkpoint.left_score < self.game_state.left_score
+                or checkpoint.right_score < self.game_state.right_score):
+            logger.warning(f"Room {self.game_id}: Ignoring checkpoint behind the database score")
+            return False
+
+        self.game_state.state = checkpoint.state
+        self.game_state.ball.x = checkpoint.ball_x
+        self.game_state.ball.y = checkpoint.ball_y
+        self.game_state.ball.dx = checkpoint.ball_dx
+        self.game_state.ball.dy = checkpoint.ball_dy
+        self.game_state.left_paddle.y_position = checkpoint.left_paddle_y
+        self.game_state.right_paddle.y_position = checkpoint.right_paddle_y
+        self.game_state.left_score = checkpoint.left_score
+        self.game_state.right_score = checkpoint.right_score
+        self.game_state.winner = checkpoint.winner
+
+        if self.game_state.state == Game.State.PLAYING:
+            self.game_state.state = Game.State.PAUSED
+        return True
+
+    def _claim_role(self, token: Optional[str]) -> Optional[Tuple[str, uuid.UUID]]:
+        """Pick the role for a connecting player, honouring a valid resume token.
+
+        The role is held as pending right away, so joins accepted concurrently can't claim it too.
+        """
+        free_roles = [role for role in self.ROLES if role not in self.player_roles.values()
+                      and role not in self.bot_roles and role not in self.pending_roles]
+
+        claim = None
+        resume = verify_token(token) if token else None
+        if resume and resume.game_id == self.db_game.id and resume.role in free_roles:
+            reserved_for = self.reservations.get(resume.role)
+            if reserved_for is None or reserved_for == resume.player_id:
+                claim = resume.role, resume.player_id
+
+        if claim is None:
+            open_roles = [role for role in free_roles if role not in self.reservations]
+            if not open_roles:
+                return None
+            claim = open_roles[0], uuid.uuid4()
+
+        self.pending_roles.add(claim[0])
+        return claim
+
+    def reserve(self, role: str, player_id: uuid.UUID) -> str:
+        """Hold a role for the player with the given id and return their resume token."""
+        self.reservations[role] = player_id
+        return issue_token(self.db_game.id, player_id, role)
+
+    @property
+    def is_occupied(self) -> bool:
+        return bool(self.players or self.bot_roles)
+
+    async def add_bot(self, role: str) -> bool:
+        """Occupy a paddle with a server-side bot, which plays through apply_command without a socket."""
+        self.bot_roles.add(role)
+        self.game_state.add_player()
+
+        player = PlayerModel(id=uuid.uuid4(), game_id=self.db_game.id, role=role)
+        self.storage.add_player(player)
+        self.player_records[role] = player
+        player.connected = True
+        self.storage.commit()
+
+        game_update_manager.broadcast_player_joined(
+            self.db_game.id,
+            self.game_state.state,
+            self.game_state.player_count
+        )
+
+        if self.game_state.player_count == 2:
+            if not acquire_game_connection():
+                self.bot_roles.discard(role)
+                self.game_state.remove_player()
+                player.connected = False
+                self.storage.commit()
+                game_update_manager.broadcast_player_joined(
+                    self.db_game.id,
+                    self.game_state.state,
+                    self.game_state.player_count
+                )
+                return False
+            self._holds_game_connection = True
+
+            self.db_game.state = self.game_state.state
+            self.storage.commit()
+            log_event("game_starting", room=self.game_id, bots=len(self.bot_roles))
+        return True
+
+    async def connect(self, websocket: WebSocket, token: Optional[str] = None,
+                      on_input: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """Seat a player and return their role, or None if no role is free for them.
+
+        on_input is called for each command arriving outside the WebSocket, over the player's datagram session.
+        """
+        if len(self.players) + len(self.pending_roles) >= 2:
             logger.warning(f"Room {self.game_id}: Connection rejected - room is full")
             return None
 
-        await websocket.accept()
+        claim = self._claim_role(token)
+        if claim is None:
+            if len(self.players) + len(self.pending_roles) + len(self.bot_roles) < len(self.ROLES):
+                held_by = "reserved"
+            else:
+                held_by = "a bot" if self.bot_roles else "being joined"
+            logger.warning(f"Room {self.game_id}: Connection rejected - remaining role is {held_by}")
+            return None
+        role, player_id = claim
+
+        try:
+            with tracer.span("accept"):
+                await websocket.accept()
+        finally:
+            self.pending_roles.discard(role)
         self.players.add(websocket)
-        role = 'left' if len(self.players) == 1 else 'right'
         self.player_roles[websocket] = role
 
         # Update game state
         self.game_state.add_player()
 
-        # Add player to database
-        player = PlayerModel(
-            game_id=self.db_game.id,
-            role=role,
-            connected=True
-        )
-        self.db.add(player)
-        self.db.commit()
+        with tracer.span("add_player"):
+            # Reuse the player row on reconnect instead of inserting a new one
+            player = self.player_records.get(role)
+            if player is None or player.id != player_id:
+                player = PlayerModel(
+                    id=player_id,
+                    game_id=self.db_game.id,
+                    role=role
+                )
+                self.storage.add_player(player)
+                self.player_records[role] = player
+            player.connected = True
+            self.storage.commit()
+
+        with tracer.span("send_tokens"):
+            await websocket.send_bytes(encode_session_token(issue_token(self.db_game.id, player_id, role)))
+
+            if datagram_transport.enabled:
+                def on_command(command: CommandType) -> None:
+                    if on_input is not None:
+                        on_input()
+                    self.apply_command(role, command)
+
+                session = datagram_transport.open_session(on_command)
+                self.datagram_sessions[websocket] = session
+                await websocket.send_bytes(encode_datagram_token(datagram_transport.port, session.token))
 
         # Broadcast player joined update
-        asyncio.create_task(game_update_manager.broadcast_player_joined(
-            self.db_game.id,
-            self.game_state.state,
-            self.game_state.player_count
-        ))
+        with tracer.span("lobby_broadcast"):
+            game_update_manager.broadcast_player_joined(
+                self.db_game.id,
+                self.game_state.state,
+                self.game_state.player_count
+            )
 
-        logger.info(f"Room {self.game_id}: Player connected as {role} ({self.game_state.player_count}/2 players)")
+        log_event("player_connected", room=self.game_id, role=role, players=self.game_state.player_count)
 
         if self.game_state.player_count == 2:
-            if not acquire_game_connection():
+            with tracer.span("acquire_game_connection"):
+                acquired = acquire_game_connection()
+            if not acquired:
                 self.disconnect(websocket)
                 raise HTTPException(status_code=503, detail="Server at connection capacity")
+            self._holds_game_connection = True
 
             # Game state will handle transitioning to PLAYING
-            self.db_game.state = self.game_state.state
-            self.db.commit()
-
-            # Start periodic state saving
-            self._save_task = asyncio.create_task(self._periodic_save())
+            with tracer.span("start_game"):
+                self.db_game.state = self.game_state.state
+                self.storage.commit()
 
-            logger.info(f"Room {self.game_id}: Game starting with 2 players")
-            await self.broadcast_game_status("game_starting")
+            log_event("game_starting", room=self.game_id)
+            with tracer.span("status_broadcast"):
+                await self.broadcast_game_status("game_starting")
         else:
-            logger.info(f"Room {self.game_id}: Waiting for more players")
-            await self.broadcast_game_status("waiting_for_players")
+            log_event("waiting_for_players", room=self.game_id)
+            with tracer.span("status_broadcast"):
+                await self.broadcast_game_status("waiting_for_players")
 
         return role
 
 
-    async def _periodic_save(self):
-        try:
-            while self.game_state.state == Game.State.PLAYING:
-                self._save_state_to_db()
-                await asyncio.sleep(self.SAVE_INTERVAL)
-        except Exception as e:
-            logger.error(f"Error in periodic save for room {self.game_id}: {e}")
-        finally:
-            self._save_state_to_db()
+    def copy_state_to_model(self) -> None:
+        """Copy the in-memory game state onto the database model without committing."""
+        self.db_game.ball_x = self.game_state.ball.x
+        self.db_game.ball_y = self.game_state.ball.y
+        self.db_game.ball_dx = self.game_state.ball.dx
+        self.db_game.ball_dy = self.game_state.ball.dy
+        self.db_game.left_paddle_y = self.game_state.left_paddle.y_position
+        self.db_game.right_paddle_y = self.game_state.right_paddle.y_position
+        self.db_game.left_score = self.game_state.left_score
+        self.db_game.right_score = self.game_state.right_score
+        self.db_game.state = self.game_state.state
+        self.db_game.winner = self.game_state.winner
 
     def _save_state_to_db(self):
         try:
-            self.db_game.ball_x = self.game_state.ball.x
-            self.db_game.ball_y = self.game_state.ball.y
-            self.db_game.left_paddle_y = self.game_state.left_paddle.y_position
-            self.db_game.right_paddle_y = self.game_state.right_paddle.y_position
-            self.db_game.left_score = self.game_state.left_score
-            self.db_game.right_score = self.game_state.right_score
-            self.db_game.state = self.game_state.state
-            self.db_game.winner = self.game_state.winner
-            self.db.commit()
+            self.copy_state_to_model()
+            self.storage.commit()
         except Exception as e:
             logger.error(f"Error saving game state for room {self.game_id}: {e}")
-            self.db.rollback()
+            self.storage.rollback()
 
     def disconnect(self, websocket: WebSocket) -> None:
         if websocket in self.players:
             role = self.player_roles[websocket]
             self.players.remove(websocket)
             del self.player_roles[websocket]
+            session = self.datagram_sessions.pop(websocket, None)
+            if session:
+                datagram_transport.close_session(session)
 
             # Update game state
             self.game_state.remove_player()
 
             # Update player connection status in database
-            player = self.db.query(PlayerModel).filter(
-                PlayerModel.game_id == self.db_game.id,
-                PlayerModel.role == role
-            ).first()
+            player = self.player_records.get(role)
             if player:
                 player.connected = False
-                self.db.commit()
+                self.storage.commit()
 
-            logger.info(f"Room {self.game_id}: {role} player disconnected ({self.game_state.player_count}/2 players)")
+            log_event("player_disconnected", room=self.game_id, role=role, players=self.game_state.player_count)
+            if self.idle:
+                self.idle.touch()
 
             if self.game_state.state == Game.State.PAUSED:
-                self.db_game.state = self.game_state.state
-                self.db.commit()
+                self._save_state_to_db()
+                self.release_game_connection_slot()
 
-                # Cancel periodic saving when game is paused
-                if self._save_task:
-                    self._save_task.cancel()
-                    release_game_connection()
+                log_event("game_paused", room=self.game_id)
+
+    def paddle(self, role: str) -> Paddle:
+        return self.game_state.left_paddle if role == "left" else self.game_state.right_paddle
+
+    def apply_command(self, role: str, command: CommandType) -> None:
+        """Move the paddle of the given role while the game is running."""
+        if self.game_state.state != Game.State.PLAYING:
+            return
 
-                logger.info(f"Room {self.game_id}: Game paused due to player disconnect")
+        paddle = self.paddle(role)
+        if command == CommandType.PADDLE_UP:
+            paddle.move_up()
+        elif command == CommandType.PADDLE_DOWN:
+            paddle.move_down()
 
-    async def update(self) -> None:
+    def record_pong(self, role: str, timestamp_ms: int) -> None:
+        """Update a player's smoothed round trip time from an echoed ping."""
+        rtt = ((int(time.monotonic() * 1000) - timestamp_ms) & 0xFFFFFFFF) / 1000
+        if rtt > self.MAX_RTT:
+            return
+        if role == "left":
+            self.game_state.left_rtt += self.RTT_SMOOTHING * (rtt - self.game_state.left_rtt)
+        else:
+            self.game_state.right_rtt += self.RTT_SMOOTHING * (rtt - self.game_state.right_rtt)
+
+    async def update(self, frames: Optional[FrameBuffer] = None) -> None:
+        await self.finish_step(self.step(frames), frames)
+
+    def step(self, frames: Optional[FrameBuffer] = None) -> RoomStep:
+        """Advance the simulation one tick and encode the state frame.
+
+        Only touches this room's game state and the given buffer, so rooms can be stepped on worker threads.
+        """
         previous_score = (self.game_state.left_score, self.game_state.right_score)
         previous_state = self.game_state.state
 
         self.game_state.update()
 
+        # Bot rooms still encode their frames, so they cost what a played room costs
+        frame = None
+        if self.is_occupied:
+            if frames is not None:
+                frame = frames.pack(self.game_state)
+            else:
+                frame = encode_game_state(
+                    self.game_state.ball.x,
+                    self.game_state.ball.y,
+                    self.game_state.left_paddle.y_position,
+                    self.game_state.right_paddle.y_position,
+                    self.game_state.left_score,
+                    self.game_state.right_score,
+                    self.game_state.winner
+                )
+        return RoomStep(previous_score, previous_state, frame)
+
+    async def finish_step(self, step: RoomStep, frames: Optional[FrameBuffer] = None) -> None:
+        """Persist, publish and send what a step produced; runs on the event loop."""
+        previous_score, previous_state, frame = step
+
+        self._ticks += 1
+        if self._ticks % self.PING_INTERVAL_TICKS == 0:
+            await self._send(encode_ping(int(time.monotonic() * 1000)))
+
         if (self.game_state.left_score, self.game_state.right_score) != previous_score:
-            asyncio.create_task(game_update_manager.broadcast_score_update(
-                uuid.UUID(self.game_id),
+            self._save_state_to_db()
+            if self.game_state.state == Game.State.PLAYING:
+                # Checkpoint the score right away, so the checkpoint is never behind the database row
+                checkpoint_store.save(self.db_game.id, self.game_state)
+            game_update_manager.broadcast_score_update(
+                self.db_game.id,
                 self.game_state.state,
                 self.game_state.player_count,
                 self.game_state.left_score,
                 self.game_state.right_score
-            ))
+            )
 
         if self.game_state.state == Game.State.GAME_OVER and previous_state != Game.State.GAME_OVER:
-            self.db_game.state = self.game_state.state
-            self.db_game.winner = self.game_state.winner
+            self._save_state_to_db()
+            checkpoint_store.release(self.db_game.id)
+            self._record_stats()
 
-            asyncio.create_task(game_update_manager.broadcast_game_over(
-                uuid.UUID(self.game_id),
+            game_update_manager.broadcast_game_over(
+                self.db_game.id,
                 self.game_state.state,
                 self.game_state.player_count,
                 self.game_state.left_score,
                 self.game_state.right_score,
                 self.game_state.winner
-            ))
+            )
 
-            if self._save_task:
-                self._save_task.cancel()
-                release_game_connection()
+            self.release_game_connection_slot()
 
             await self.broadcast_game_status(f"game_over_{self.game_state.winner}")
 
-        await self.broadcast_state()
-
-    async def broadcast_state(self) -> None:
-        if not self.players:
-            return
-
-        state_bytes = encode_game_state(
-            self.game_state.ball.x,
-            self.game_state.ball.y,
-            self.game_state.left_paddle.y_position,
-            self.game_state.right_paddle.y_position,
+        if frame is not None:
+            await self.send_state(frame, frames)
+
+    def _record_stats(self) -> None:
+        if self.bot_roles:
+            return  # Bot games are load, not matches
+        created_at = self.db_game.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=UTC)
+        left, right = self.player_records.get("left"), self.player_records.get("right")
+        match_stats.record_game(
+            self.game_state.winner,
             self.game_state.left_score,
             self.game_state.right_score,
-            self.game_state.winner
+            (datetime.now(UTC) - created_at).total_seconds(),
+            left.id if left else None,
+            right.id if right else None
         )
 
-        disconnected_players = set()
+    async def send_state(self, state_bytes: bytes | memoryview, frames: Optional[FrameBuffer] = None) -> None:
+        """Send a state frame to every player; sends are counted on the frame buffer."""
+        sent = 0
+        remote = False
+        disconnected_players = None
         for player in list(self.players):
+            # Players with a bound datagram session get state frames over UDP
+            session = self.datagram_sessions.get(player)
+            if session is not None and datagram_transport.send_state(session, state_bytes):
+                sent += 1
+                continue
+            # Broadcast workers send the frame to their players from the frame ring
+            if type(player) is RemoteSocket:
+                remote = True
+                sent += 1  # Counted like a local send; the worker delivers it from the published frame
+                continue
             try:
                 await player.send_bytes(state_bytes)
+                sent += 1
             except (WebSocketDisconnect, RuntimeError):
-                disconnected_players.add(player)
+                if disconnected_players is None:
+                    disconnected_players = []
+                disconnected_players.append(player)
 
-        for player in disconnected_players:
-            self.disconnect(player)
+        if remote:
+            broadcast_hub.publish_frame(self.game_id, state_bytes)
+
+        if frames is not None:
+            frames.sent += sent
+            frames.bytes_sent += sent * len(state_bytes)
+
+        if disconnected_players:
+            for player in disconnected_players:
+                self.disconnect(player)
+
+    async def _send(self, data: bytes) -> None:
+        """Send a message to every player over their WebSocket."""
+        for player in list(self.players):
+            try:
+                await player.send_bytes(data)
+            except (WebSocketDisconnect, RuntimeError):
+                pass
 
     async def broadcast_game_status(self, status: str) -> None:
-        logger.debug(f"Room {self.game_id}: Broadcasting status - {status}")
+        log_event("status_broadcast", level=logging.DEBUG, room=self.game_id, status=status)
         status_bytes = encode_game_status(status)
         disconnected_players = set()
 
@@ -240,33 +511,200 @@ class GameRoom:
         for player in disconnected_players:
             self.disconnect(player)
 
-    def cancel_save_task(self) -> None:
-        """Cancel the periodic save task if it exists and is running."""
-        if self._save_task and not self._save_task.done():
-            self._save_task.cancel()
+    def release_game_connection_slot(self) -> None:
+        """Release the room's game connection exactly once."""
+        if self._holds_game_connection:
+            self._holds_game_connection = False
             release_game_connection()
 
+    async def close_connections(self, code: int, reason: str) -> None:
+        """Close every player connection concurrently."""
+        results = await asyncio.gather(
+            *(player.close(code=code, reason=reason) for player in list(self.players)),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error closing WebSocket connection in room {self.game_id}: {result}")
+
 
 class GameRoomManager:
-    def __init__(self):
+    def __init__(self, storage: Storage):
         self.rooms: Dict[str, GameRoom] = {}
-        self.db = SessionLocal()
+        # The same rooms split by tick phase, so the game loop doesn't regroup them every tick
+        self.phases: List[Dict[str, GameRoom]] = [{} for _ in range(TICK_PHASES)]
+        self.storage = storage
+        self.draining = False
+        # Waiting games kept past ROOM_EXPIRY, with the monotonic time their hold ends
+        self.held_games: Dict[uuid.UUID, float] = {}
+        timer_wheel.schedule(ROOM_EXPIRY, self.sweep_waiting_games)
+
+    def _add_room(self, room: GameRoom) -> None:
+        room.idle = IdleTimeout(timer_wheel, ROOM_EXPIRY, lambda: self._expire_room(room.game_id))
+        self.rooms[room.game_id] = room
+        self.phases[room.tick_phase][room.game_id] = room
+
+    def _expire_room(self, game_id: str) -> None:
+        room = self.rooms.get(game_id)
+        if room is None:
+            return
+        if room.is_occupied or (room.game_state.state == Game.State.WAITING and time.monotonic() < room.held_until):
+            room.idle.restart()
+            return
+
+        log_event("room_expired", room=game_id, state=room.game_state.state.value)
+        self.remove_room(game_id)
+        if room.game_state.state == Game.State.WAITING:
+            try:
+                self.storage.delete_games([room.db_game.id])
+            except Exception as e:
+                logger.error(f"Error deleting expired game {game_id}: {e}")
+                self.storage.rollback()
+
+    def sweep_waiting_games(self) -> None:
+        """Delete waiting games nobody joined within the expiry, then schedule the next sweep."""
+        try:
+            now = time.monotonic()
+            self.held_games = {game_id: until for game_id, until in self.held_games.items() if until > now}
+
+            cutoff = datetime.now(UTC) - timedelta(seconds=ROOM_EXPIRY)
+            live = self.live_game_ids()
+            stale = [game_id for game_id in self.storage.stale_waiting_games(cutoff)
+                     if game_id not in live and game_id not in self.held_games]
+            if stale:
+                self.storage.delete_games(stale)
+                for game_id in stale:
+                    game_update_manager.broadcast_game_closed(game_id)
+                log_event("waiting_games_expired", count=len(stale))
+        except Exception as e:
+            logger.error(f"Error expiring waiting games: {e}")
+            self.storage.rollback()
+        finally:
+            timer_wheel.schedule(ROOM_EXPIRY, self.sweep_waiting_games)
 
-    async def create_room(self, game_id: str) -> GameRoom:  # Make method async
+    async def create_room(self, game_id: str) -> Optional[GameRoom]:  # Make method async
         if game_id not in self.rooms:
-            logger.info(f"Creating new room: {game_id}")
-            room = GameRoom(game_id, self.db)
-            self.rooms[game_id] = room
+            if self.draining:
+                logger.warning(f"Room {game_id}: Creation rejected - server is draining")
+                return None
+            if not load_monitor.admit_room():
+                log_event("room_refused", level=logging.WARNING, room=game_id,
+                          signals=",".join(load_monitor.overloaded_signals()))
+                return None
+            with tracer.span("create_room"):
+                log_event("room_created", room=game_id)
+                room = GameRoom(game_id, self.storage)
+                room.held_until = self.held_games.get(room.db_game.id, 0.0)
+                self._add_room(room)
         return self.rooms[game_id]
 
+    def create_games(self, count: int, hold: float = 0.0) -> List[GameModel]:
+        """Insert several waiting games with a single bulk insert; their rooms are created on first join.
+
+        A hold keeps the games that long while they wait for players, even past ROOM_EXPIRY.
+        """
+        if self.draining or not load_monitor.admit_room():
+            return []
+
+        db_games = [GameModel(id=uuid.uuid4(), state=Game.State.WAITING) for _ in range(count)]
+        self.storage.add_games(db_games)
+        if hold:
+            until = time.monotonic() + hold
+            self.held_games.update((db_game.id, until) for db_game in db_games)
+        game_update_manager.broadcast_new_games([db_game.id for db_game in db_games], Game.State.WAITING)
+        return db_games
+
+    def create_rooms(self, count: int, hold: float = 0.0) -> List[GameRoom]:
+        """Create several new rooms with a single bulk insert, held like create_games holds games."""
+        rooms = []
+        for db_game in self.create_games(count, hold):
+            room = GameRoom(str(db_game.id), self.storage, db_game, is_new=True)
+            room.held_until = self.held_games.get(db_game.id, 0.0)
+            self._add_room(room)
+            rooms.append(room)
+
+        if rooms:
+            logger.info(f"Created {len(rooms)} rooms in bulk")
+        return rooms
+
+    def live_game_ids(self) -> Set[uuid.UUID]:
+        return {room.db_game.id for room in self.rooms.values()}
+
     def get_room(self, game_id: str) -> Optional[GameRoom]:
         return self.rooms.get(game_id)
 
     def remove_room(self, game_id: str) -> None:
         if game_id in self.rooms:
             room = self.rooms[game_id]
-            room.cancel_save_task()
-            logger.info(f"Removing room: {game_id}")
+            room.release_game_connection_slot()
+            if room.idle:
+                room.idle.cancel()
+            checkpoint_store.release(room.db_game.id)
+            game_update_manager.broadcast_game_closed(room.db_game.id)
+            log_event("room_removed", room=game_id)
             del self.rooms[game_id]
+            del self.phases[room.tick_phase][game_id]
+
+    def restore_rooms(self) -> int:
+        """Load drained and crashed rooms into memory so reconnecting players skip the database."""
+        checkpoints = {checkpoint.room_id: checkpoint for checkpoint in checkpoint_store.recover()}
+
+        cutoff = datetime.now(UTC) - timedelta(seconds=RESTORE_WINDOW)
+        db_games: List[GameModel] = self.storage.restorable_games(
+            [Game.State.PLAYING, Game.State.PAUSED], cutoff, list(checkpoints)
+        )
+
+        for db_game in db_games:
+            game_id = str(db_game.id)
+            if game_id not in self.rooms:
+                room = GameRoom(game_id, self.storage, db_game)
+                checkpoint = checkpoints.pop(db_game.id, None)
+                if checkpoint:
+                    room.apply_checkpoint(checkpoint)
+                self._add_room(room)
+                # Lists the room in the lobby again, with its restored score
+                game_update_manager.broadcast_score_update(
+                    db_game.id,
+                    room.game_state.state,
+                    room.game_state.player_count,
+                    room.game_state.left_score,
+                    room.game_state.right_score
+                )
+
+        # Checkpoints of games the database doesn't know about can't be resumed
+        for room_id in checkpoints:
+            checkpoint_store.release(room_id)
+
+        logger.info(f"Restored {len(db_games)} rooms from previous run")
+        return len(db_games)
+
+    def checkpoint_rooms(self) -> None:
+        """Write the state of every running room to the crash-recovery checkpoint file."""
+        for room in self.rooms.values():
+            if room.game_state.state == Game.State.PLAYING:
+                checkpoint_store.save(room.db_game.id, room.game_state)
+
+    def flush_rooms(self) -> None:
+        """Write the exact state of every room in a single transaction."""
+        try:
+            for room in self.rooms.values():
+                room.copy_state_to_model()
+            self.storage.commit()
+        except Exception as e:
+            logger.error(f"Error flushing room states: {e}")
+            self.storage.rollback()
+
+    async def drain(self) -> None:
+        """Stop accepting rooms, persist all rooms and ask their players to reconnect."""
+        self.draining = True
+        self.flush_rooms()
+
+        await asyncio.gather(*(
+            room.close_connections(RECONNECT_CLOSE_CODE, "Server restarting")
+            for room in list(self.rooms.values())
+        ))
+
+        for room_id in list(self.rooms.keys()):
+            self.remove_room(room_id)
 
-game_room_manager = GameRoomManager()
\ No newline at end of file
+game_room_manager = GameRoomManager(storage)
\ No newline at end of file
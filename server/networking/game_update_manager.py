@@ -1,57 +1,226 @@
 import asyncio
-from typing import Set
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
 from fastapi import WebSocket
 
 from domain.game import Game
-from networking.binary_protocol import GameUpdateType, encode_game_update
-import uuid
+from logger import logger
+from networking.binary_protocol import (GameUpdateType, encode_game_update, encode_lobby_snapshot,
+                                       encode_new_games, encode_sequenced_update)
+
+RESULT_FIELDS = slice(19, 22)  # Left score, right score and winner within an update record
+
+
+class Subscriber:
+    """A lobby subscriber with its own topics, pending queue and writer task."""
+    MAX_PENDING = 64  # Distinct games buffered before the oldest update is dropped
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.all_updates = True  # Until the client picks topics it receives everything
+        self.new_games = False
+        self.scores = False
+        self.game_ids: Set[uuid.UUID] = set()
+        # One pending (sequence, record) per game; a newer update for the same game replaces the
+        # older one and keeps its sequence number, so only dropped updates leave a gap. A batch of
+        # new games is queued under its own key with a list of records.
+        self.pending: OrderedDict[uuid.UUID, Tuple[int, Union[bytes, List[bytes]]]] = OrderedDict()
+        self.snapshot: Optional[bytes] = None
+        self.sequence = 0
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+    def wants(self, update_type: GameUpdateType, game_id: uuid.UUID) -> bool:
+        if self.all_updates or game_id in self.game_ids:
+            return True
+        if self.new_games and update_type in (GameUpdateType.NEW_GAME, GameUpdateType.GAME_CLOSED):
+            return True
+        return self.scores and update_type in (GameUpdateType.SCORE_UPDATE, GameUpdateType.GAME_OVER)
+
+    def enqueue(self, game_id: uuid.UUID, record: Union[bytes, List[bytes]]) -> None:
+        queued = self.pending.get(game_id)
+        if queued is not None:
+            self.pending[game_id] = (queued[0], record)
+        else:
+            if len(self.pending) >= self.MAX_PENDING:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.sequence += 1
+            self.pending[game_id] = (self.sequence, record)
+        self.wakeup.set()
+
+    def reset(self, snapshot_records: List[bytes]) -> None:
+        """Replace everything pending with a snapshot that later updates build on."""
+        self.pending.clear()
+        self.sequence += 1
+        self.snapshot = encode_lobby_snapshot(self.sequence, snapshot_records)
+        self.wakeup.set()
+
+    def apply_topics(self, topics: str) -> None:
+        """Subscribe to a comma separated list of topics: new_games, scores or game:<id>."""
+        for topic in filter(None, (part.strip() for part in topics.split(","))):
+            self.handle_command(f"subscribe {topic}")
+
+    def handle_command(self, command: str) -> bool:
+        """Apply a "subscribe <topic>" or "unsubscribe <topic>" text command."""
+        action, _, topic = command.strip().partition(" ")
+        if action not in ("subscribe", "unsubscribe"):
+            return False
+        enabled = action == "subscribe"
+
+        if topic == "all":
+            self.all_updates = enabled
+            return True
+
+        if topic == "new_games":
+            self.new_games = enabled
+        elif topic == "scores":
+            self.scores = enabled
+        elif topic.startswith("game:"):
+            try:
+                game_id = uuid.UUID(topic[len("game:"):])
+            except ValueError:
+                return False
+            if enabled:
+                self.game_ids.add(game_id)
+            else:
+                self.game_ids.discard(game_id)
+        else:
+            return False
+
+        # Choosing a topic narrows a subscriber that was receiving everything
+        if enabled:
+            self.all_updates = False
+        return True
+
 
 class GameUpdateManager:
     def __init__(self):
-        self._subscribers: Set[WebSocket] = set()
-        self._lock = asyncio.Lock()
+        self._subscribers: Dict[WebSocket, Subscriber] = {}
+        # Latest update record of every live game, versioned so the snapshot is only rebuilt after changes
+        self._games: Dict[uuid.UUID, bytes] = {}
+        self._version = 0
+        self._snapshot_version = -1
+        self._snapshot_records: List[bytes] = []
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, topics: Optional[str] = None) -> Subscriber:
         await websocket.accept()
-        async with self._lock:
-            self._subscribers.add(websocket)
+        subscriber = Subscriber(websocket)
+        if topics:
+            subscriber.apply_topics(topics)
+        self._subscribers[websocket] = subscriber
+        subscriber.reset(self._snapshot(subscriber))
+        subscriber.writer = asyncio.create_task(self._write(subscriber))
+        return subscriber
+
+    def resync(self, subscriber: Subscriber) -> None:
+        """Send a fresh snapshot to a subscriber that detected a sequence gap."""
+        subscriber.reset(self._snapshot(subscriber))
+
+    def _snapshot(self, subscriber: Optional[Subscriber] = None) -> List[bytes]:
+        """Latest record of every live game, limited to the subscriber's topics if given."""
+        if self._snapshot_version != self._version:
+            self._snapshot_records = list(self._games.values())
+            self._snapshot_version = self._version
+        if subscriber is None or subscriber.all_updates:
+            return self._snapshot_records
+        return [record for record in self._snapshot_records
+                if subscriber.wants(GameUpdateType(record[0]), uuid.UUID(bytes=record[1:17]))]
+
+    def queue_depth(self) -> int:
+        """Number of updates waiting in subscriber queues."""
+        return sum(len(subscriber.pending) for subscriber in self._subscribers.values())
 
     async def disconnect(self, websocket: WebSocket):
-        async with self._lock:
-            self._subscribers.discard(websocket)
-
-    async def _broadcast_bytes(self, data: bytes):
-        disconnected = set()
-        async with self._lock:
-            for subscriber in self._subscribers:
-                try:
-                    await subscriber.send_bytes(data)
-                except:
-                    disconnected.add(subscriber)
-            for subscriber in disconnected:
-                self._subscribers.discard(subscriber)
-
-    async def broadcast_new_game(self, game_id: uuid.UUID, state: Game.State):
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber and subscriber.writer:
+            subscriber.writer.cancel()
+
+    async def _write(self, subscriber: Subscriber):
+        """Drain one subscriber's queue so a slow client only delays itself."""
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                while subscriber.snapshot is not None or subscriber.pending:
+                    # A reset while sending replaces what was pending, so its snapshot goes out first
+                    if subscriber.snapshot is not None:
+                        snapshot, subscriber.snapshot = subscriber.snapshot, None
+                        await subscriber.websocket.send_bytes(snapshot)
+                        continue
+                    _, (sequence, record) = subscriber.pending.popitem(last=False)
+                    if isinstance(record, list):
+                        await subscriber.websocket.send_bytes(encode_new_games(sequence, record))
+                    else:
+                        await subscriber.websocket.send_bytes(encode_sequenced_update(record, sequence))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping game update subscriber: {e}")
+            self._subscribers.pop(subscriber.websocket, None)
+
+    def _publish(self, update_type: GameUpdateType, game_id: uuid.UUID, data: bytes):
+        if update_type in (GameUpdateType.GAME_OVER, GameUpdateType.GAME_CLOSED):
+            self._games.pop(game_id, None)
+        else:
+            self._games[game_id] = data
+        self._version += 1
+
+        for subscriber in self._subscribers.values():
+            if subscriber.wants(update_type, game_id):
+                subscriber.enqueue(game_id, data)
+
+    def broadcast_new_game(self, game_id: uuid.UUID, state: Game.State):
         data = encode_game_update(GameUpdateType.NEW_GAME, game_id, state, 0)
-        await self._broadcast_bytes(data)
+        self._publish(GameUpdateType.NEW_GAME, game_id, data)
+
+    def broadcast_new_games(self, game_ids: List[uuid.UUID], state: Game.State):
+        """Announce games created together in one message per subscriber instead of one per game."""
+        records = {game_id: encode_game_update(GameUpdateType.NEW_GAME, game_id, state, 0) for game_id in game_ids}
+        self._games.update(records)
+        self._version += 1
 
-    async def broadcast_score_update(self, game_id: uuid.UUID, state: Game.State,
-                                     player_count: int, left_score: int, right_score: int):
+        batch_id = uuid.uuid4()  # Batches are never coalesced with other updates
+        everything = list(records.values())
+        for subscriber in self._subscribers.values():
+            if subscriber.all_updates or subscriber.new_games:
+                wanted = everything
+            else:
+                wanted = [record for game_id, record in records.items() if game_id in subscriber.game_ids]
+            if wanted:
+                subscriber.enqueue(batch_id, wanted)
+
+    def broadcast_score_update(self, game_id: uuid.UUID, state: Game.State,
+                               player_count: int, left_score: int, right_score: int):
         data = encode_game_update(GameUpdateType.SCORE_UPDATE, game_id, state,
                                   player_count, left_score, right_score)
-        await self._broadcast_bytes(data)
+        self._publish(GameUpdateType.SCORE_UPDATE, game_id, data)
 
-    async def broadcast_game_over(self, game_id: uuid.UUID, state: Game.State,
-                                  player_count: int, left_score: int, right_score: int,
-                                  winner: str):
+    def broadcast_game_over(self, game_id: uuid.UUID, state: Game.State,
+                            player_count: int, left_score: int, right_score: int,
+                            winner: str):
         data = encode_game_update(GameUpdateType.GAME_OVER, game_id, state,
                                   player_count, left_score, right_score, winner)
-        await self._broadcast_bytes(data)
+        self._publish(GameUpdateType.GAME_OVER, game_id, data)
 
-    async def broadcast_player_joined(self, game_id: uuid.UUID, state: Game.State,
-                                      player_count: int):
+    def broadcast_player_joined(self, game_id: uuid.UUID, state: Game.State,
+                                player_count: int):
         data = encode_game_update(GameUpdateType.PLAYER_JOINED, game_id, state,
                                   player_count)
-        await self._broadcast_bytes(data)
+        previous = self._games.get(game_id)
+        if previous is not None:
+            # Joins don't change the score, so keep the one already known, e.g. on a mid-game reconnect
+            data = data[:RESULT_FIELDS.start] + previous[RESULT_FIELDS] + data[RESULT_FIELDS.stop:]
+        self._publish(GameUpdateType.PLAYER_JOINED, game_id, data)
+
+
+    def broadcast_game_closed(self, game_id: uuid.UUID):
+        """Drop a game that left memory without finishing from the live summary."""
+        if game_id not in self._games:
+            return
+        data = encode_game_update(GameUpdateType.GAME_CLOSED, game_id, Game.State.WAITING, 0)
+        self._publish(GameUpdateType.GAME_CLOSED, game_id, data)
 
 game_update_manager = GameUpdateManager()
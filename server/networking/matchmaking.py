@@ -0,0 +1,118 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from logger import logger
+from networking.binary_protocol import encode_match_found
+from networking.game_room_manager import GameRoom, GameRoomManager, game_room_manager
+from networking.timer_wheel import Timer, timer_wheel
+
+
+@dataclass
+class QueueEntry:
+    websocket: WebSocket
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    expiry: Optional[Timer] = None
+
+
+class MatchmakingQueue:
+    PAIR_INTERVAL = float(os.getenv("MATCHMAKING_INTERVAL", "0.25"))  # Seconds between pairing batches
+    ENTRY_TIMEOUT = float(os.getenv("MATCHMAKING_TIMEOUT", "120"))  # Seconds a player may wait for a match
+
+    def __init__(self, room_manager: GameRoomManager):
+        self.room_manager = room_manager
+        # Insertion ordered, so the longest waiting players are paired first; O(1) join, leave and pop
+        self._waiting: OrderedDict[uuid.UUID, QueueEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    async def join(self, websocket: WebSocket) -> QueueEntry:
+        await websocket.accept()
+        entry = QueueEntry(websocket)
+        entry.expiry = timer_wheel.schedule(self.ENTRY_TIMEOUT, lambda: self._expire(entry.id))
+        self._waiting[entry.id] = entry
+        return entry
+
+    def leave(self, entry_id: uuid.UUID) -> None:
+        entry = self._waiting.pop(entry_id, None)
+        if entry and entry.expiry:
+            entry.expiry.cancel()
+
+    def _expire(self, entry_id: uuid.UUID) -> None:
+        entry = self._waiting.pop(entry_id, None)
+        if entry:
+            logger.info(f"Matchmaking entry {entry_id} expired")
+            asyncio.create_task(self._close(entry, "Matchmaking timed out"))
+
+    async def run(self) -> None:
+        """Pair waiting players in batches until cancelled."""
+        while True:
+            await asyncio.sleep(self.PAIR_INTERVAL)
+            try:
+                await self.pair_waiting_players()
+            except Exception as e:
+                logger.error(f"Error in matchmaking: {e}")
+
+    async def pair_waiting_players(self) -> None:
+        if len(self._waiting) < 2 or self.room_manager.draining:
+            return
+
+        pairs: List[Tuple[QueueEntry, QueueEntry]] = []
+        while len(self._waiting) >= 2:
+            _, left = self._waiting.popitem(last=False)
+            _, right = self._waiting.popitem(last=False)
+            left.expiry.cancel()
+            right.expiry.cancel()
+            pairs.append((left, right))
+
+        try:
+            rooms = self.room_manager.create_rooms(len(pairs))
+        except Exception as e:
+            logger.error(f"Matchmaking failed to create rooms, requeueing {len(pairs)} pairs: {e}")
+            self._requeue(pairs)
+            return
+        if len(rooms) < len(pairs):
+            self._requeue(pairs[len(rooms):])
+
+        results = await asyncio.gather(*(
+            self._notify(room, left, right) for room, (left, right) in zip(rooms, pairs)
+        ), return_exceptions=True)
+        for room, (left, right), result in zip(rooms, pairs, results):
+            if isinstance(result, Exception):
+                # The players may already hold part of the match, so they rejoin the queue themselves
+                logger.error(f"Room {room.game_id}: Failed to place matched players: {result}")
+                await asyncio.gather(self._close(left, "Match failed"), self._close(right, "Match failed"))
+        logger.info(f"Matchmaking paired {len(rooms)} rooms")
+
+    def _requeue(self, pairs: List[Tuple[QueueEntry, QueueEntry]]) -> None:
+        """Put players the server could not place back at the front of the queue, in order."""
+        for left, right in reversed(pairs):
+            for entry in (right, left):
+                entry.expiry = timer_wheel.schedule(self.ENTRY_TIMEOUT, lambda entry_id=entry.id: self._expire(entry_id))
+                self._waiting[entry.id] = entry
+                self._waiting.move_to_end(entry.id, last=False)
+
+    async def _notify(self, room: GameRoom, left: QueueEntry, right: QueueEntry) -> None:
+        for role, entry in (("left", left), ("right", right)):
+            token = room.reserve(role, entry.id)
+            try:
+                await entry.websocket.send_bytes(encode_match_found(room.db_game.id, role, token))
+            except Exception as e:
+                logger.warning(f"Room {room.game_id}: Failed to notify matched {role} player: {e}")
+            await self._close(entry, "Match found")
+
+    @staticmethod
+    async def _close(entry: QueueEntry, reason: str) -> None:
+        try:
+            await entry.websocket.close(code=1000, reason=reason)
+        except Exception:
+            pass
+
+
+matchmaking_queue = MatchmakingQueue(game_room_manager)
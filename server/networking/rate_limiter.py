@@ -0,0 +1,79 @@
+import os
+import time
+from typing import Dict
+
+INPUT_RATE = float(os.getenv("INPUT_RATE_LIMIT", "120"))  # Sustained inbound messages per second
+INPUT_BURST = float(os.getenv("INPUT_BURST", "30"))  # Messages allowed in a burst
+OFFENDER_WINDOW = float(os.getenv("INPUT_OFFENDER_WINDOW", "5"))  # Seconds over which drops are counted
+OFFENDER_THRESHOLD = int(os.getenv("INPUT_OFFENDER_THRESHOLD", "300"))  # Drops per window before disconnecting
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def consume(self) -> bool:
+        """Take one token, returning False if the bucket is empty."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class InputLimiterStats:
+    def __init__(self):
+        self.allowed = 0
+        self.dropped = 0
+        self.limited_connections = 0
+        self.disconnected = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "dropped": self.dropped,
+            "limited_connections": self.limited_connections,
+            "disconnected": self.disconnected,
+        }
+
+
+input_limiter_stats = InputLimiterStats()
+
+
+class InputLimiter:
+    """Rate limit the inbound messages of one connection and detect persistent offenders."""
+
+    def __init__(self, rate: float = INPUT_RATE, burst: float = INPUT_BURST,
+                 stats: InputLimiterStats = input_limiter_stats):
+        self.bucket = TokenBucket(rate, burst)
+        self.stats = stats
+        self.window_start = time.monotonic()
+        self.window_drops = 0
+        self.limited = False
+
+    def allow(self) -> bool:
+        if self.bucket.consume():
+            self.stats.allowed += 1
+            return True
+
+        self.stats.dropped += 1
+        if not self.limited:
+            self.limited = True
+            self.stats.limited_connections += 1
+
+        if self.bucket.updated - self.window_start >= OFFENDER_WINDOW:
+            self.window_start = self.bucket.updated
+            self.window_drops = 0
+        self.window_drops += 1
+        return False
+
+    @property
+    def is_offender(self) -> bool:
+        return self.window_drops >= OFFENDER_THRESHOLD
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import uuid
+from typing import NamedTuple, Optional
+
+# Tokens must survive a warm restart, so deployments should pin the secret
+RESUME_TOKEN_SECRET = os.getenv("RESUME_TOKEN_SECRET", "").encode() or secrets.token_bytes(32)
+SIGNATURE_SIZE = 16
+
+ROLE_CODES = {"left": 1, "right": 2}
+ROLES_BY_CODE = {code: role for role, code in ROLE_CODES.items()}
+
+
+class ResumeToken(NamedTuple):
+    game_id: uuid.UUID
+    player_id: uuid.UUID
+    role: str
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(RESUME_TOKEN_SECRET, payload, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def issue_token(game_id: uuid.UUID, player_id: uuid.UUID, role: str) -> str:
+    """Issue a signed token that lets a player reclaim their paddle."""
+    payload = game_id.bytes + player_id.bytes + bytes([ROLE_CODES[role]])
+    return base64.urlsafe_b64encode(payload + _sign(payload)).decode("ascii")
+
+
+def verify_token(token: str) -> Optional[ResumeToken]:
+    """Return the token contents if the signature is valid, otherwise None."""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode("ascii"))
+    except (ValueError, UnicodeEncodeError):
+        return None
+
+    if len(raw) != 33 + SIGNATURE_SIZE:
+        return None
+
+    payload, signature = raw[:33], raw[33:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+
+    role = ROLES_BY_CODE.get(payload[32])
+    if role is None:
+        return None
+
+    return ResumeToken(uuid.UUID(bytes=payload[:16]), uuid.UUID(bytes=payload[16:32]), role)
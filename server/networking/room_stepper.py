@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from logger import logger
+from networking.binary_protocol import FrameBuffer
+from networking.game_room_manager import GameRoom, RoomStep
+
+ROOM_STEP_THREADS = int(os.getenv("ROOM_STEP_THREADS", "0"))  # 0 steps rooms on the event loop thread
+
+
+def gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled else True
+
+
+class RoomStepper:
+    """Steps every room once per tick, optionally in partitions on a thread pool.
+
+    Workers run the simulation and encode frames into a buffer per partition; persistence, lobby
+    updates and sends happen afterwards on the event loop. Threads only help on free-threaded
+    builds, so with the GIL enabled rooms are stepped on the event loop as before.
+    """
+
+    def __init__(self, threads: int = ROOM_STEP_THREADS):
+        self.threads = threads if threads > 0 and not gil_enabled() else 0
+        if threads > 0 and not self.threads:
+            logger.warning("ROOM_STEP_THREADS ignored: the GIL is enabled, stepping rooms on the event loop")
+
+        self.buffers = [FrameBuffer() for _ in range(max(1, self.threads))]
+        # The event loop thread steps the first partition itself
+        self._pool = ThreadPoolExecutor(self.threads - 1, thread_name_prefix="room-step") if self.threads > 1 else None
+        self.rooms_stepped = 0
+        self.slowest_room_time = 0.0
+        self.slowest_room: Optional[str] = None
+
+    @property
+    def frames_sent(self) -> int:
+        return sum(buffer.sent for buffer in self.buffers)
+
+    @property
+    def bytes_sent(self) -> int:
+        return sum(buffer.bytes_sent for buffer in self.buffers)
+
+    async def step(self, rooms: List[GameRoom]) -> None:
+        for buffer in self.buffers:
+            buffer.reset()
+        self.rooms_stepped = 0
+        self.slowest_room_time = 0.0
+        self.slowest_room = None
+
+        if not self.threads:
+            buffer = self.buffers[0]
+            for room in rooms:
+                start = time.perf_counter()
+                try:
+                    await room.update(buffer)
+                except RuntimeError:
+                    continue
+                finally:
+                    self._count(room, time.perf_counter() - start)
+            return
+
+        partitions = [rooms[i::len(self.buffers)] for i in range(len(self.buffers))]
+        futures = [self._pool.submit(self._step_partition, partitions[i], self.buffers[i])
+                   for i in range(1, len(partitions))] if self._pool else []
+        # Waiting blocks the event loop like sequential stepping does, so no input is applied mid-step
+        results = [self._step_partition(partitions[0], self.buffers[0])] + [future.result() for future in futures]
+
+        for buffer, partition_results in zip(self.buffers, results):
+            for room, step, duration in partition_results:
+                start = time.perf_counter()
+                try:
+                    await room.finish_step(step, buffer)
+                except RuntimeError:
+                    continue
+                finally:
+                    self._count(room, duration + time.perf_counter() - start)
+
+    @staticmethod
+    def _step_partition(rooms: List[GameRoom], buffer: FrameBuffer) -> List[Tuple[GameRoom, RoomStep, float]]:
+        results = []
+        for room in rooms:
+            start = time.perf_counter()
+            try:
+                step = room.step(buffer)
+            except Exception as e:
+                logger.error(f"Error stepping room {room.game_id}: {e}")
+                continue
+            results.append((room, step, time.perf_counter() - start))
+        return results
+
+    def _count(self, room: GameRoom, duration: float) -> None:
+        self.rooms_stepped += 1
+        if duration > self.slowest_room_time:
+            self.slowest_room_time = duration
+            self.slowest_room = room.game_id
+
+    def shutdown(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=False)
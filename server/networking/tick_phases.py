@@ -0,0 +1,42 @@
+import os
+import zlib
+from typing import Dict, List
+
+TICK_PERIOD = 1 / 60
+TICK_PHASES = max(1, int(os.getenv("TICK_PHASES", "4")))  # Groups of rooms stepped at offsets within a tick
+# Seconds between the start of consecutive groups; spreads them evenly over the tick by default
+TICK_PHASE_GAP = float(os.getenv("TICK_PHASE_GAP", str(TICK_PERIOD / TICK_PHASES)))
+
+
+def tick_phase(room_id: str) -> int:
+    """The phase group a room is stepped in; stable for the room's lifetime and across restarts."""
+    return zlib.crc32(room_id.encode()) % TICK_PHASES
+
+
+class TickPhaseStats:
+    """Duration of stepping each phase group, as the last value, a smoothed average and the maximum."""
+    SMOOTHING = 0.02  # Roughly the last 50 ticks
+
+    def __init__(self, phases: int = TICK_PHASES):
+        self.last = [0.0] * phases
+        self.average = [0.0] * phases
+        self.max = [0.0] * phases
+        self.rooms = [0] * phases
+
+    def record(self, phase: int, duration: float, rooms: int) -> None:
+        self.last[phase] = duration
+        self.average[phase] += self.SMOOTHING * (duration - self.average[phase])
+        self.max[phase] = max(self.max[phase], duration)
+        self.rooms[phase] = rooms
+
+    def as_dict(self) -> Dict[str, List[float]]:
+        return {
+            "gap": TICK_PHASE_GAP,
+            "rooms": self.rooms,
+            "last": self.last,
+            "average": self.average,
+            "max": self.max,
+        }
+
+
+tick_phase_stats = TickPhaseStats()
@@ -0,0 +1,113 @@
+import math
+import os
+import time
+from typing import Callable, List, Optional
+
+from logger import logger
+
+TIMER_RESOLUTION = float(os.getenv("TIMER_RESOLUTION", "0.05"))  # Seconds per wheel slot
+TIMER_SLOTS = int(os.getenv("TIMER_SLOTS", "1024"))
+
+
+class Timer:
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timer wheel advanced by the game loop instead of one event loop timer per deadline.
+
+    Timers are hashed into slots by deadline; timers more than one revolution away stay in their
+    slot until their round comes. Cancelling only flags the timer, it is dropped when its slot is visited.
+    """
+
+    def __init__(self, resolution: float = TIMER_RESOLUTION, slots: int = TIMER_SLOTS):
+        self.resolution = resolution
+        self.now = time.monotonic()
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._tick = int(self.now / resolution)
+
+    def __len__(self) -> int:
+        return sum(len(slot) for slot in self._slots)
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        timer = Timer(time.monotonic() + delay, callback)
+        tick = max(math.ceil(timer.deadline / self.resolution), self._tick + 1)
+        self._slots[tick % len(self._slots)].append(timer)
+        return timer
+
+    def advance(self, now: Optional[float] = None) -> None:
+        """Run every timer that is due, visiting only the slots passed since the last call."""
+        self.now = time.monotonic() if now is None else now
+        target = int(self.now / self.resolution)
+        # After a stall longer than one revolution every slot is visited once
+        steps = min(target - self._tick, len(self._slots))
+        due: List[Timer] = []
+
+        for tick in range(self._tick + 1, self._tick + steps + 1):
+            index = tick % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                continue
+            remaining = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.deadline <= self.now:
+                    due.append(timer)
+                else:
+                    remaining.append(timer)
+            self._slots[index] = remaining
+        self._tick = max(self._tick, target)
+
+        for timer in due:
+            try:
+                timer.callback()
+            except Exception as e:
+                logger.error(f"Error in timer callback: {e}")
+
+
+class IdleTimeout:
+    """Calls on_expire once nothing touched it for the timeout.
+
+    Touching only records the wheel's current time; the deadline is pushed back lazily when the timer fires.
+    """
+
+    def __init__(self, wheel: TimerWheel, timeout: float, on_expire: Callable[[], None]):
+        self.wheel = wheel
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self.expired = False
+        self.last_activity = wheel.now
+        self._timer = wheel.schedule(timeout, self._check)
+
+    def touch(self) -> None:
+        self.last_activity = self.wheel.now
+
+    def restart(self) -> None:
+        """Start a new idle period, also after the timeout expired."""
+        self.cancel()
+        self.expired = False
+        self.last_activity = self.wheel.now
+        self._timer = self.wheel.schedule(self.timeout, self._check)
+
+    def cancel(self) -> None:
+        self._timer.cancel()
+
+    def _check(self) -> None:
+        idle = self.wheel.now - self.last_activity
+        if idle < self.timeout:
+            self._timer = self.wheel.schedule(self.timeout - idle, self._check)
+            return
+        self.expired = True
+        self.on_expire()
+
+
+timer_wheel = TimerWheel()
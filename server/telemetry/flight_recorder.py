@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from array import array
+from datetime import datetime, UTC
+from typing import List, Optional, Tuple
+
+from logger import logger, log_event
+from telemetry.load_monitor import TICK_BUDGET
+
+FLIGHT_RECORDER_TICKS = int(os.getenv("FLIGHT_RECORDER_TICKS", "3600"))  # One minute at 60 FPS
+FLIGHT_RECORDER_DIR = os.getenv("FLIGHT_RECORDER_DIR", ".")
+OVERRUN_DUMP_FACTOR = float(os.getenv("OVERRUN_DUMP_FACTOR", "5"))  # Dump when a tick takes this many budgets
+DUMP_DELAY_TICKS = 120  # Ticks recorded after an overrun before dumping, to see how the server recovered
+DUMP_COOLDOWN = 60.0  # Minimum seconds between automatic dumps
+
+
+class FlightRecorder:
+    """Fixed-size ring buffer of per-tick timing records.
+
+    Storage is allocated once, so recording a tick is a handful of array stores.
+    """
+    FIELDS = ("start", "work", "rooms", "frames", "bytes", "slowest_room_time", "db_time")
+    START, WORK, ROOMS, FRAMES, BYTES, SLOWEST_ROOM_TIME, DB_TIME = range(len(FIELDS))
+
+    def __init__(self, capacity: int = FLIGHT_RECORDER_TICKS, directory: str = FLIGHT_RECORDER_DIR):
+        self.capacity = capacity
+        self.directory = directory
+        self.dumps = 0
+        self._data = array('d', bytes(8 * capacity * len(self.FIELDS)))
+        self._slowest_rooms: List[Optional[str]] = [None] * capacity
+        self._recorded = 0
+        self._dump_at: Optional[int] = None
+        self._last_auto_dump = -DUMP_COOLDOWN
+
+    def record(self, start: float, work: float, rooms: int, frames: int, bytes_sent: int,
+               slowest_room_time: float, slowest_room: Optional[str], db_time: float) -> None:
+        index = self._recorded % self.capacity
+        base = index * len(self.FIELDS)
+        data = self._data
+        data[base] = start
+        data[base + 1] = work
+        data[base + 2] = rooms
+        data[base + 3] = frames
+        data[base + 4] = bytes_sent
+        data[base + 5] = slowest_room_time
+        data[base + 6] = db_time
+        self._slowest_rooms[index] = slowest_room
+        self._recorded += 1
+
+        if work > OVERRUN_DUMP_FACTOR * TICK_BUDGET and self._dump_at is None:
+            now = time.monotonic()
+            if now - self._last_auto_dump >= DUMP_COOLDOWN:
+                self._last_auto_dump = now
+                self._dump_at = self._recorded + DUMP_DELAY_TICKS
+                log_event("tick_overrun", work=f"{work:.4f}")
+        if self._dump_at is not None and self._recorded >= self._dump_at:
+            self._dump_at = None
+            self.dump_to_file("overrun")
+
+    def snapshot(self) -> Tuple[array, List[Optional[str]]]:
+        """Copy the recorded ticks, oldest first."""
+        width = len(self.FIELDS)
+        if self._recorded <= self.capacity:
+            return self._data[:self._recorded * width], self._slowest_rooms[:self._recorded]
+        first = self._recorded % self.capacity
+        return (self._data[first * width:] + self._data[:first * width],
+                self._slowest_rooms[first:] + self._slowest_rooms[:first])
+
+    @classmethod
+    def format_csv(cls, data: array, slowest_rooms: List[Optional[str]]) -> str:
+        width = len(cls.FIELDS)
+        lines = [",".join(cls.FIELDS) + ",slowest_room"]
+        for i, room in enumerate(slowest_rooms):
+            record = data[i * width:(i + 1) * width]
+            lines.append(f"{record[0]:.6f},{record[1]:.6f},{int(record[2])},{int(record[3])},{int(record[4])},"
+                         f"{record[5]:.6f},{record[6]:.6f},{room or ''}")
+        return "\n".join(lines) + "\n"
+
+    def dump_csv(self) -> str:
+        return self.format_csv(*self.snapshot())
+
+    def dump_to_file(self, reason: str = "signal") -> None:
+        """Write the recorded ticks to a CSV file; formatting and writing happen off the event loop."""
+        data, slowest_rooms = self.snapshot()
+        path = os.path.join(self.directory, f"flight-{datetime.now(UTC):%Y%m%dT%H%M%S}-{reason}.csv")
+        self.dumps += 1
+        log_event("flight_recorder_dump", path=path, reason=reason, ticks=len(slowest_rooms))
+
+        def write() -> None:
+            try:
+                with open(path, "w") as f:
+                    f.write(self.format_csv(data, slowest_rooms))
+            except OSError as e:
+                logger.error(f"Failed to write flight recorder dump {path}: {e}")
+
+        asyncio.get_running_loop().run_in_executor(None, write)
+
+
+flight_recorder = FlightRecorder()
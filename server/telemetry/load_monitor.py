@@ -0,0 +1,82 @@
+import asyncio
+import os
+from typing import Callable, Dict, List
+
+MAX_LOOP_LAG = float(os.getenv("MAX_LOOP_LAG", "0.05"))  # Seconds of smoothed event loop lag
+MAX_TICK_OVERRUN_RATE = float(os.getenv("MAX_TICK_OVERRUN_RATE", "0.2"))  # Share of ticks over budget
+MAX_OUTBOUND_QUEUE = int(os.getenv("MAX_OUTBOUND_QUEUE", "10000"))  # Messages waiting to be sent
+MAX_DB_POOL_SATURATION = float(os.getenv("MAX_DB_POOL_SATURATION", "0.9"))  # Share of pooled connections in use
+ADMISSION_REDIRECT_URL = os.getenv("ADMISSION_REDIRECT_URL")  # Another instance to send new rooms to
+
+TICK_BUDGET = 1 / 60
+
+
+class LoadMonitor:
+    """Track load signals and decide whether the server can take on new rooms."""
+    SAMPLE_INTERVAL = 0.1  # Seconds between event loop lag samples
+    LAG_SMOOTHING = 0.2
+    TICK_SMOOTHING = 0.02  # Roughly the last 50 ticks
+
+    def __init__(self):
+        self.loop_lag = 0.0
+        self.tick_overrun_rate = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.refused_rooms = 0
+        self._queue_sources: List[Callable[[], int]] = []
+        self._pool_saturation: Callable[[], float] = lambda: 0.0
+
+    def add_queue_source(self, source: Callable[[], int]) -> None:
+        """Register a callable that reports how many outbound messages are waiting."""
+        self._queue_sources.append(source)
+
+    def set_pool_saturation_source(self, source: Callable[[], float]) -> None:
+        self._pool_saturation = source
+
+    async def run(self) -> None:
+        """Sample event loop lag until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.SAMPLE_INTERVAL)
+            lag = max(0.0, loop.time() - start - self.SAMPLE_INTERVAL)
+            self.loop_lag += self.LAG_SMOOTHING * (lag - self.loop_lag)
+
+    def record_tick(self, duration: float) -> None:
+        self.ticks += 1
+        overrun = duration > TICK_BUDGET
+        if overrun:
+            self.overruns += 1
+        self.tick_overrun_rate += self.TICK_SMOOTHING * (overrun - self.tick_overrun_rate)
+
+    def signals(self) -> Dict[str, float]:
+        return {
+            "loop_lag": self.loop_lag,
+            "tick_overrun_rate": self.tick_overrun_rate,
+            "outbound_queue_depth": sum(source() for source in self._queue_sources),
+            "db_pool_saturation": self._pool_saturation(),
+        }
+
+    def overloaded_signals(self) -> List[str]:
+        signals = self.signals()
+        limits = {
+            "loop_lag": MAX_LOOP_LAG,
+            "tick_overrun_rate": MAX_TICK_OVERRUN_RATE,
+            "outbound_queue_depth": MAX_OUTBOUND_QUEUE,
+            "db_pool_saturation": MAX_DB_POOL_SATURATION,
+        }
+        return [name for name, limit in limits.items() if signals[name] >= limit]
+
+    @property
+    def admitting(self) -> bool:
+        return not self.overloaded_signals()
+
+    def admit_room(self) -> bool:
+        """Decide whether a new room may be created, counting refusals."""
+        if self.admitting:
+            return True
+        self.refused_rooms += 1
+        return False
+
+
+load_monitor = LoadMonitor()
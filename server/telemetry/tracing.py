@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Deque, Dict, List, Optional
+
+from logger import logger
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # Share of joins traced; 0 turns tracing off
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory")  # memory or file
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MEMORY_SIZE = int(os.getenv("TRACE_MEMORY_SIZE", "256"))  # Traces kept by the memory exporter
+LATENCY_SAMPLES = 1024  # Latest durations kept per stage for percentiles
+
+
+class Span:
+    """A timed step of a trace; used as a context manager, nesting under the span it runs in."""
+    __slots__ = ("trace", "name", "parent", "start", "end", "attributes")
+
+    def __init__(self, trace: Optional["Trace"], name: str, attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.parent: Optional[str] = None
+        self.start = 0.0
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    def __enter__(self) -> "Span":
+        stack = self.trace.stack
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.trace.spans.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.end = time.perf_counter()
+        self.trace.stack.pop()
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class _NoopSpan:
+    """Returned for spans outside a sampled trace, so unsampled code pays one context variable lookup."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """A sampled operation with the spans it ran, in start order."""
+    __slots__ = ("id", "root", "wall_start", "spans", "stack", "token")
+
+    def __init__(self, name: str, attributes: Dict):
+        self.id = os.urandom(8).hex()
+        self.wall_start = time.time()
+        self.root = Span(self, name, attributes)
+        self.root.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.stack: List[Span] = [self.root]
+        self.token: Optional[Token] = None
+
+    def as_dict(self) -> Dict:
+        start = self.root.start
+        return {
+            "trace_id": self.id,
+            "name": self.root.name,
+            "start": self.wall_start,
+            "duration": self.root.duration,
+            "attributes": self.root.attributes,
+            "spans": [{
+                "name": span.name,
+                "parent": span.parent,
+                "offset": span.start - start,
+                "duration": span.duration,
+                **({"attributes": span.attributes} if span.attributes else {}),
+            } for span in self.spans],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class SpanExporter(ABC):
+    """Receives every finished trace."""
+
+    @abstractmethod
+    def export(self, trace: Trace) -> None:
+        raise NotImplementedError
+
+    def traces(self) -> List[Dict]:
+        """Recently exported traces, if the exporter keeps any."""
+        return []
+
+
+class MemoryExporter(SpanExporter):
+    def __init__(self, size: int = TRACE_MEMORY_SIZE):
+        self._traces: Deque[Dict] = deque(maxlen=size)
+
+    def export(self, trace: Trace) -> None:
+        self._traces.append(trace.as_dict())
+
+    def traces(self) -> List[Dict]:
+        return list(self._traces)
+
+
+class FileExporter(SpanExporter):
+    """Appends traces to a JSON lines file, off the event loop."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.as_dict()) + "\n"
+
+        def write() -> None:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(line)
+            except OSError as e:
+                logger.error(f"Failed to write trace to {self.path}: {e}")
+
+        try:
+            asyncio.get_running_loop().run_in_executor(None, write)
+        except RuntimeError:
+            write()
+
+
+class StageLatency:
+    """Latest durations of each span name across traces, for percentiles by stage."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.samples = samples
+        self._durations: Dict[str, array] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, trace: Trace) -> None:
+        stages = {trace.root.name: trace.root.duration}
+        for span in trace.spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration  # Repeated steps add up
+
+        for name, duration in stages.items():
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = array('d', bytes(8 * self.samples))
+                self._counts[name] = 0
+            durations[self._counts[name] % self.samples] = duration
+            self._counts[name] += 1
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name, durations in self._durations.items():
+            count = self._counts[name]
+            recent = sorted(durations[:min(count, self.samples)])
+            result[name] = {
+                "count": count,
+                "p50": recent[int(0.50 * (len(recent) - 1))],
+                "p90": recent[int(0.90 * (len(recent) - 1))],
+                "p99": recent[int(0.99 * (len(recent) - 1))],
+            }
+        return result
+
+
+class Tracer:
+    """Samples traces of an operation and times the spans run within them.
+
+    The current trace lives in a context variable, so spans in called code and child tasks find it
+    without it being passed around.
+    """
+
+    def __init__(self, exporter: SpanExporter, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.latency = StageLatency()
+
+    def start_trace(self, name: str, **attributes) -> Optional[Trace]:
+        """Start a trace if this operation is sampled; returns None otherwise."""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(name, attributes)
+        trace.token = _current_trace.set(trace)
+        return trace
+
+    def end_trace(self, trace: Optional[Trace]) -> None:
+        """Finish and export a trace; ending it again, or ending None, does nothing."""
+        if trace is None or trace.root.end is not None:
+            return
+        trace.root.end = time.perf_counter()
+        try:
+            _current_trace.reset(trace.token)
+        except ValueError:
+            _current_trace.set(None)  # Ended from another context
+
+        self.latency.record(trace)
+        try:
+            self.exporter.export(trace)
+        except Exception as e:
+            logger.error(f"Error exporting trace: {e}")
+
+    @staticmethod
+    def span(name: str, **attributes):
+        """Time a step of the current trace; a shared no-op outside one."""
+        trace = _current_trace.get()
+        if trace is None:
+            return NOOP_SPAN
+        return Span(trace, name, attributes)
+
+
+def create_exporter() -> SpanExporter:
+    if TRACE_EXPORTER == "file":
+        return FileExporter()
+    return MemoryExporter()
+
+
+tracer = Tracer(create_exporter())
@@ -0,0 +1,89 @@
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from networking.broadcast_ring import FrameRing, MessageRing  # noqa: E402
+
+MESSAGES = 50000
+GENERATIONS = 20000
+SLOTS = 8
+FRAME_SIZE = 64
+FRAME_RING_DEPTH = 4  # Shallow, so the reader is lapped and sees generations being overwritten
+
+
+def produce(message_ring: str, frame_ring: str) -> None:
+    """Runs in a separate process: fills both rings as fast as the reader lets it."""
+    messages = MessageRing.attach(message_ring)
+    frames = FrameRing.attach(frame_ring)
+    for i in range(MESSAGES):
+        # Varying lengths make records wrap around the end of the buffer at different offsets
+        while not messages.put(i.to_bytes(4, "little"), bytes([i % 251]) * (i % 97)):
+            pass
+    for generation in range(1, GENERATIONS + 1):
+        for slot in range(generation % SLOTS + 1):
+            frames.write(slot, bytes([(generation + slot) % 256]) * FRAME_SIZE)
+        frames.publish()
+    messages.close()
+    frames.close()
+
+
+def main():
+    print(f"Testing broadcast rings across processes with {MESSAGES} messages and {GENERATIONS} frame generations...")
+    messages = MessageRing.create(4096)
+    frames = FrameRing.create(FRAME_RING_DEPTH, SLOTS, FRAME_SIZE)
+    producer = multiprocessing.get_context("spawn").Process(target=produce, args=(messages.name, frames.name))
+    producer.start()
+
+    failures = []
+    received = 0
+    deadline = time.monotonic() + 60
+    while received < MESSAGES and time.monotonic() < deadline:
+        message = messages.get()
+        if message is None:
+            continue
+        index = int.from_bytes(message[:4], "little")
+        if index != received or message[4:] != bytes([index % 251]) * (index % 97):
+            failures.append(f"message {received} arrived torn or out of order")
+            break
+        received += 1
+
+    read = skipped = 0
+    last = 0
+    while last < GENERATIONS and time.monotonic() < deadline:
+        latest = frames.latest
+        for generation in range(last + 1, latest + 1):
+            pairs = frames.frames(generation)
+            if pairs is None:
+                skipped += 1
+                continue
+            read += 1
+            if [slot for slot, _ in pairs] != list(range(generation % SLOTS + 1)):
+                failures.append(f"generation {generation} listed the wrong slots")
+            for slot, frame in pairs:
+                if frame != bytes([(generation + slot) % 256]) * FRAME_SIZE:
+                    failures.append(f"generation {generation} slot {slot} was torn")
+        last = latest
+    producer.join(10)
+
+    print(f"Messages received: {received}/{MESSAGES}")
+    print(f"Frame generations read: {read}, dropped as overwritten: {skipped}")
+
+    if received != MESSAGES:
+        failures.append("not every message arrived")
+    if producer.exitcode != 0:
+        failures.append(f"producer exited with {producer.exitcode}")
+    messages.close(unlink=True)
+    frames.close(unlink=True)
+
+    if failures:
+        print("\nTest failed: " + "; ".join(failures[:5]))
+        sys.exit(1)
+
+    print("\nAll tests passed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import struct
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from domain.game import Game  # noqa: E402
+from networking.binary_protocol import CommandType, FrameBuffer  # noqa: E402
+from networking.datagram_transport import DatagramTransport, DatagramType, is_newer  # noqa: E402
+
+LOSS_RATE = 0.3
+FRAMES = 300
+
+
+class DatagramClient(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.bound = asyncio.Event()
+        self.last_sequence = 0
+        self.frames_received = 0
+        self.stale_frames = 0
+        self.ball_positions: List[float] = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, _):
+        if data[0] == DatagramType.HELLO_ACK:
+            self.bound.set()
+        elif data[0] == DatagramType.STATE:
+            sequence = struct.unpack_from('!I', data, 1)[0]
+            if not is_newer(sequence, self.last_sequence):
+                self.stale_frames += 1
+                return
+            self.last_sequence = sequence
+            self.frames_received += 1
+            self.ball_positions.append(struct.unpack_from('!f', data, 6)[0])
+
+    def send_input(self, sequence: int, command: CommandType):
+        self.transport.sendto(struct.pack('!BIB', DatagramType.INPUT, sequence, command))
+
+
+async def bind(client: DatagramClient, token: bytes) -> bool:
+    for _ in range(20):
+        client.transport.sendto(bytes([DatagramType.HELLO]) + token)
+        try:
+            await asyncio.wait_for(client.bound.wait(), timeout=0.1)
+            return True
+        except asyncio.TimeoutError:
+            continue
+    return False
+
+
+async def main():
+    print(f"Testing datagram transport on localhost with {LOSS_RATE:.0%} simulated loss...")
+    loop = asyncio.get_running_loop()
+
+    server = DatagramTransport(loss_rate=LOSS_RATE)
+    await server.start("127.0.0.1", 0)
+
+    commands: List[CommandType] = []
+    session = server.open_session(commands.append)
+
+    _, client = await loop.create_datagram_endpoint(DatagramClient, remote_addr=("127.0.0.1", server.port))
+    if not await bind(client, session.token):
+        print("Test failed: could not bind datagram session")
+        sys.exit(1)
+
+    game = Game()
+    frames = FrameBuffer()
+    for frame in range(FRAMES):
+        frames.reset()
+        game.ball.x = frame / FRAMES
+        server.send_state(session, frames.pack(game))
+        if frame % 10 == 0:
+            client.send_input(frame // 10 + 1, CommandType.PADDLE_UP)
+        await asyncio.sleep(0.001)
+
+    # A replayed input must be ignored
+    client.send_input(session.last_input_sequence, CommandType.PADDLE_DOWN)
+    await asyncio.sleep(0.05)
+
+    print(f"Frames received: {client.frames_received}/{FRAMES}")
+    print(f"Inputs applied: {len(commands)}/{FRAMES // 10}")
+    print(f"Server stats: {server.stats.as_dict()}")
+
+    failures = []
+    if not 0 < client.frames_received < FRAMES:
+        failures.append("expected some but not all frames to arrive")
+    if client.ball_positions != sorted(client.ball_positions):
+        failures.append("frames were applied out of order")
+    if CommandType.PADDLE_DOWN in commands:
+        failures.append("stale input was applied")
+
+    client.transport.close()
+    server.close()
+
+    if failures:
+        print("\nTest failed: " + "; ".join(failures))
+        sys.exit(1)
+
+    print("\nAll tests passed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
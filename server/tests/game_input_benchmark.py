@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("INPUT_RATE_LIMIT", "1e12")  # Measure the handler, not the rate limiter
+os.environ.setdefault("INPUT_BURST", "1e12")
+
+from starlette.websockets import WebSocket  # noqa: E402
+
+from api.websockets import CONNECTION_TIMEOUT, GameConnectionApp  # noqa: E402
+from networking.binary_protocol import CommandType, decode_command  # noqa: E402
+from networking.game_room_manager import Game, game_room_manager  # noqa: E402
+from networking.rate_limiter import InputLimiter  # noqa: E402
+from networking.timer_wheel import IdleTimeout, timer_wheel  # noqa: E402
+
+CONNECTIONS = int(os.getenv("BENCH_CONNECTIONS", "100"))
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "2000"))  # Paddle commands per connection
+COMMANDS = (bytes([CommandType.PADDLE_UP]), bytes([CommandType.PADDLE_DOWN]))
+
+
+def scripted_receive(messages):
+    events = iter(messages)
+
+    async def receive():
+        return next(events)
+
+    return receive
+
+
+async def discard(message) -> None:
+    pass
+
+
+def script() -> list:
+    inputs = [{"type": "websocket.receive", "bytes": COMMANDS[i % 2]} for i in range(MESSAGES)]
+    return [{"type": "websocket.connect"}] + inputs + [{"type": "websocket.disconnect", "code": 1000}]
+
+
+async def bot_opponents():
+    rooms = game_room_manager.create_rooms(CONNECTIONS)
+    for room in rooms:
+        await room.add_bot("right")  # The benchmarked socket takes the left paddle and starts the game
+    return rooms
+
+
+async def fast_path() -> float:
+    """Messages per second through the raw ASGI game endpoint."""
+    app = GameConnectionApp(game_room_manager)
+    rooms = await bot_opponents()
+    scopes = [{"type": "websocket", "path_params": {"game_id": room.game_id}, "query_string": b""} for room in rooms]
+    receives = [scripted_receive(script()) for _ in rooms]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(app(scope, receive, discard) for scope, receive in zip(scopes, receives)))
+    return CONNECTIONS * MESSAGES / (time.perf_counter() - start)
+
+
+async def starlette_baseline() -> float:
+    """Messages per second reading the same events through Starlette's WebSocket, as the handler used to."""
+    rooms = await bot_opponents()
+    scope = {"type": "websocket", "path_params": {}, "query_string": b"", "headers": []}
+
+    async def handle(room, receive):
+        websocket = WebSocket(scope, receive, discard)
+        role = await room.connect(websocket)
+        limiter = InputLimiter()
+        idle = IdleTimeout(timer_wheel, CONNECTION_TIMEOUT, asyncio.current_task().cancel)
+        while True:
+            message = await websocket.receive()
+            idle.touch()
+            if message["type"] == "websocket.disconnect":
+                break
+            if not limiter.allow() or room.game_state.state != Game.State.PLAYING:
+                continue
+            if message["type"] == "websocket.receive" and "bytes" in message and message["bytes"]:
+                room.apply_command(role, decode_command(message["bytes"]))
+        idle.cancel()
+        room.disconnect(websocket)
+        game_room_manager.remove_room(room.game_id)
+
+    receives = [scripted_receive(script()) for _ in rooms]
+    start = time.perf_counter()
+    await asyncio.gather(*(handle(room, receive) for room, receive in zip(rooms, receives)))
+    return CONNECTIONS * MESSAGES / (time.perf_counter() - start)
+
+
+async def main():
+    logging.disable(logging.WARNING)  # Connection logs would dominate the measurement
+    print(f"{CONNECTIONS} connections x {MESSAGES} paddle commands on one event loop (one core)")
+    await fast_path()  # Warm up the interpreter and logging before timing anything
+
+    baseline = await starlette_baseline()
+    fast = await fast_path()
+    print(f"starlette WebSocket: {baseline:,.0f} msgs/s per core")
+    print(f"raw ASGI fast path:  {fast:,.0f} msgs/s per core, {fast / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
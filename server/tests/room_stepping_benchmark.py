@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from domain.game import Game  # noqa: E402
+from networking.binary_protocol import FrameBuffer  # noqa: E402
+from networking.game_room_manager import RoomStep  # noqa: E402
+from networking.room_stepper import RoomStepper, gil_enabled  # noqa: E402
+
+ROOMS = int(os.getenv("BENCH_ROOMS", "2000"))
+TICKS = int(os.getenv("BENCH_TICKS", "300"))
+THREAD_COUNTS = [0, 1, 2, 4, 8]
+ROUNDS = 3  # Each round runs the thread counts in a rotated order; the best rate of each is reported
+WARMUP_TICKS = 30
+
+
+class BenchRoom:
+    """A room that only simulates and encodes, so the benchmark measures the work threads can share."""
+
+    def __init__(self, index: int):
+        self.game_id = str(index)
+        self.game_state = Game()
+        self.game_state.add_player()
+        self.game_state.add_player()
+        self.game_state.POINTS_TO_WIN = 1 << 30  # Keep every room playing
+        self.game_state.ball.dy += index % 7 * 0.001  # Rooms shouldn't run in lockstep
+
+    def step(self, frames: FrameBuffer) -> RoomStep:
+        previous = (self.game_state.left_score, self.game_state.right_score)
+        self.game_state.update()
+        return RoomStep(previous, self.game_state.state, frames.pack(self.game_state))
+
+    async def finish_step(self, step: RoomStep, frames: FrameBuffer) -> None:
+        frames.sent += 2
+        frames.bytes_sent += 2 * len(step.frame)
+
+    async def update(self, frames: FrameBuffer) -> None:
+        await self.finish_step(self.step(frames), frames)
+
+
+async def measure(threads: int) -> float:
+    stepper = RoomStepper(threads)
+    rooms = [BenchRoom(i) for i in range(ROOMS)]
+    for _ in range(WARMUP_TICKS):  # Warm up the pool and caches, so no configuration pays for running first
+        await stepper.step(rooms)
+
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        await stepper.step(rooms)
+    elapsed = time.perf_counter() - start
+    stepper.shutdown()
+    return ROOMS * TICKS / elapsed
+
+
+async def main():
+    logging.disable(logging.WARNING)  # Score events would dominate the measurement
+    print(f"Stepping {ROOMS} rooms for {TICKS} ticks (GIL {'enabled' if gil_enabled() else 'disabled'})")
+    if gil_enabled():
+        print("Thread counts fall back to stepping on the event loop; run on a free-threaded build to see scaling")
+
+    rates = dict.fromkeys(THREAD_COUNTS, 0.0)
+    for round_index in range(ROUNDS):
+        shift = round_index % len(THREAD_COUNTS)
+        for threads in THREAD_COUNTS[shift:] + THREAD_COUNTS[:shift]:
+            rates[threads] = max(rates[threads], await measure(threads))
+
+    baseline = rates[THREAD_COUNTS[0]]
+    for threads, rate in rates.items():
+        budget_rooms = int(rate / Game.TICK_RATE)
+        print(f"threads={threads}: {rate:,.0f} room steps/s, {rate / baseline:.2f}x, "
+              f"~{budget_rooms:,} rooms per 60 FPS tick budget")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())